@@ -1,26 +1,681 @@
 import os
 import re
+import sys
+import argparse
+import tempfile
+import itertools
 import subprocess
+import threading
+import queue
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, Spinbox
 from datetime import datetime
 from pathlib import Path
 import json
-import pandas as pd
-from PIL import Image, ImageTk
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas as pdf_canvas
-from reportlab.lib.units import mm
-from reportlab.graphics.barcode import code128
-from barcode import Code128 as BC128
-from barcode.writer import ImageWriter
-from io import BytesIO
 import math
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+from collections import OrderedDict, deque
+from functools import lru_cache
+# Só módulos leves no topo: pandas, PIL e o resto do ReportLab são
+# importados no primeiro uso para a janela abrir rápido
+from reportlab.lib.units import mm
+from layout import (A4_SHEET, LABEL_W, LABEL_H, BARCODE_BAR_WIDTH, BARCODE_HEIGHT,
+                    BARCODE_MAX_WIDTH, brand_block, is_big_logo, place_label, place_labels,
+                    load_templates, pack_template)
+from ingest import DATE_FORMAT, TIME_FORMAT, SheetError, iter_records, find_invalid
+from sheetcache import SheetCache, file_digest, render_digest
+from timing import ENV_VAR as TIMING_ENV, TIMINGS, stage
+from vectorlogo import is_vector
+from serials import CounterStore, PatternError, check_pattern, codes, is_pattern
+from logobundle import BUNDLE_PATH, LogoBundle, pdf_key, preview_key, write_bundle
+
+
+def flatten_logo(path):
+    """Abre a logo e compõe sobre branco puro, retornando uma imagem RGB.
+
+    Logos SVG/PDF são rasterizadas (só preview e ZPL; o PDF usa os vetores).
+    """
+    with stage('logo.flatten'):
+        if is_vector(path):
+            from vectorlogo import rasterize
+            return rasterize(path)
+        return _flatten_logo(path)
+
+
+def _flatten_logo(path):
+    from PIL import Image
+    orig = Image.open(path).convert('RGBA')
+    white_bg = Image.new('RGBA', orig.size, (255,255,255,255))
+    white_bg.paste(orig, mask=orig.split()[3])
+    # Força todos pixels não totalmente opacos para branco (máscara via LUT,
+    # sem percorrer os pixels em Python)
+    opaque = white_bg.getchannel('A').point(lambda a: 255 if a == 255 else 0)
+    white = Image.new('RGB', orig.size, (255,255,255))
+    # Converte para RGB antes de redimensionar (elimina canal alfa)
+    return Image.composite(white_bg.convert('RGB'), white, opaque)
+
+
+class LRUCache:
+    """Cache LRU simples: `get` devolve o valor da chave ou o constrói com `build`."""
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        # Preview (thread Tk) e geração do PDF (thread de fundo) usam o mesmo
+        # cache; reentrante porque um build pode consultar outra chave
+        self._lock = threading.RLock()
+
+    def get(self, key, build):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+            value = build()
+            self.put(key, value)
+            return value
+
+    def find(self, key, default=None):
+        """Valor da chave sem construir, ou `default`."""
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class LogoCache(LRUCache):
+    """Cache LRU das logos já achatadas e de suas variantes redimensionadas.
+
+    As chaves são (caminho, mtime, tamanho alvo, dpi), então cada logo é
+    decodificada uma única vez por processo e reaproveitada pelo preview e
+    pelo PDF. Alterar o arquivo no disco invalida as entradas antigas.
+    Com um `bundle` (logobundle.LogoBundle), as variantes já compiladas vêm
+    do pacote e a imagem original nem é aberta.
+    """
+
+    def __init__(self, maxsize=64, bundle=None):
+        super().__init__(maxsize)
+        self.bundle = bundle
+
+    def _prebuilt(self, path, key):
+        if self.bundle is None:
+            return None
+        with stage('logo.bundle'):
+            return self.bundle.image(path, key)
+
+    def flattened(self, path):
+        mtime = os.path.getmtime(path)
+        return self.get((path, mtime, None, None), lambda: flatten_logo(path))
+
+    def vector(self, path):
+        """Caminhos de uma logo SVG/PDF (vectorlogo.VectorLogo)."""
+        from vectorlogo import load_vector
+        mtime = os.path.getmtime(path)
+        return self.get((path, mtime, 'vector', None), lambda: load_vector(path))
+
+    def for_preview(self, path, height_px):
+        """Logo com altura fixa em pixels, largura proporcional."""
+        def build():
+            img = self._prebuilt(path, preview_key(height_px))
+            if img is None:
+                base = self.flattened(path)
+                w, h = base.size
+                img = self._resize(base, (int(w * height_px / h), height_px))
+            return img
+        mtime = os.path.getmtime(path)
+        return self.get((path, mtime, height_px, None), build)
+
+    @staticmethod
+    def pdf_pixels(box_w, box_h, dpi=300):
+        """Caixa máxima em pixels da logo do PDF."""
+        mm_to_inch = 1/25.4
+        return int(box_w * mm_to_inch * dpi), int(box_h * mm_to_inch * dpi)
+
+    def for_pdf(self, path, box_w, box_h, dpi=300):
+        """Logo reduzida para caber na caixa (em pontos) na resolução dada."""
+        px_w, px_h = self.pdf_pixels(box_w, box_h, dpi)
+        def build():
+            img = self._prebuilt(path, pdf_key(px_w, px_h, dpi))
+            if img is None:
+                base = self.flattened(path)
+                w, h = base.size
+                scale = min(px_w/w, px_h/h)
+                size = (max(1, int(w * scale)), max(1, int(h * scale)))
+                img = self._resize(base, size)
+            return img
+        mtime = os.path.getmtime(path)
+        return self.get((path, mtime, (px_w, px_h), dpi), build)
+
+    @staticmethod
+    def _resize(img, size):
+        from PIL import Image
+        with stage('logo.resize'):
+            return img.resize(size, Image.LANCZOS)
+
+
+LOGO_BUNDLE = LogoBundle(BUNDLE_PATH)
+LOGO_CACHE = LogoCache(bundle=LOGO_BUNDLE)
+
+class BarcodeCache(LRUCache):
+    """Cache LRU de códigos de barras Code128 já codificados.
+
+    As chaves são (valor, parâmetros da simbologia, tamanho alvo): numa folha
+    com 2 códigos distintos, só 2 barcodes são construídos para o PDF, e o
+    preview reaproveita as barras enquanto o campo Código não muda.
+    """
+
+    def for_pdf(self, value, bar_height=BARCODE_HEIGHT, bar_width=BARCODE_BAR_WIDTH,
+                max_width=BARCODE_MAX_WIDTH):
+        """Code128 do ReportLab e a escala horizontal para caber em max_width."""
+        from reportlab.graphics.barcode import code128
+        def build():
+            with stage('barcode.build'):
+                bc = code128.Code128(value, barHeight=bar_height, barWidth=bar_width)
+            return bc, min(1.0, max_width/bc.width)
+        return self.get(('pdf', value, bar_height, bar_width, max_width), build)
+
+    def bars(self, value, bar_height=BARCODE_HEIGHT, bar_width=BARCODE_BAR_WIDTH,
+             max_width=BARCODE_MAX_WIDTH):
+        """Barras (x, largura) em pontos, já na escala usada no PDF, e a largura total.
+
+        Usa o mesmo padrão de módulos do code128 do ReportLab, então o preview
+        desenha exatamente as barras que irão para o PDF.
+        """
+        def build():
+            bc, scale = self.for_pdf(value, bar_height, bar_width, max_width)
+            oa, oA = ord('a') - 1, ord('A') - 1
+            left = bc.lquiet if bc.quiet else 0
+            bars = []
+            for ch in bc.decomposed:
+                if ch.islower():
+                    left += (ord(ch) - oa) * bar_width
+                elif ch.isupper():
+                    w = (ord(ch) - oA) * bar_width
+                    bars.append((left*scale, w*scale))
+                    left += w
+            return tuple(bars), bc.width*scale
+        return self.get(('bars', value, bar_height, bar_width, max_width), build)
+
+
+BARCODE_CACHE = BarcodeCache(maxsize=256)
+
+
+class PdfLogoForms:
+    """Registra cada logo uma única vez por documento como XObject nomeado.
+
+    A primeira etiqueta que usa uma logo define o form; as demais apenas o
+    referenciam com doForm, em vez de repetir o bitmap inline a cada etiqueta.
+    Logos SVG/PDF entram no form como vetores. `repeated` faz o mesmo com
+    qualquer trecho que se repita, como a parte fixa das etiquetas.
+    """
+
+    def __init__(self, canvas, cache=LOGO_CACHE, dpi=300):
+        self.canvas = canvas
+        self.cache = cache
+        self.dpi = dpi
+        self._names = {}
+        # Trechos desenhados uma vez, que viram form se aparecerem de novo
+        self._seen = OrderedDict()
+
+    def repeated(self, key, bbox, draw):
+        """Desenha com draw(); da segunda vez com a mesma chave em diante, via form.
+
+        Trechos que nunca se repetem (p.ex. linhas de planilha todas
+        diferentes) são desenhados direto, sem o custo de um form.
+        `bbox` é (x0, y0, x1, y1) em coordenadas locais.
+        """
+        c = self.canvas
+        name = self._names.get(key)
+        if name is None:
+            if key not in self._seen:
+                self._seen[key] = None
+                if len(self._seen) > 1024:
+                    self._seen.popitem(last=False)
+                draw()
+                return
+            name = f'fixo{len(self._names)}'
+            c.beginForm(name, *bbox)
+            draw()
+            c.endForm()
+            self._names[key] = name
+        c.doForm(name)
+
+    def draw(self, path, x, y, width, height):
+        from reportlab.lib.utils import ImageReader
+        c = self.canvas
+        key = (path, width, height)
+        name = self._names.get(key)
+        if name is None:
+            name = f'logo{len(self._names)}'
+            if is_vector(path):
+                from vectorlogo import draw_vector, end_form
+                logo = self.cache.vector(path)
+                with stage('pdf.logo_vector'):
+                    c.beginForm(name, 0, 0, width, height)
+                    draw_vector(c, logo, width, height)
+                    end_form(c)
+            else:
+                img = self.cache.for_pdf(path, width, height, self.dpi)
+                with stage('pdf.logo_image'):
+                    c.beginForm(name, 0, 0, width, height)
+                    c.drawImage(ImageReader(img), 0, 0, width=width, height=height)
+                    c.endForm()
+            self._names[key] = name
+        c.saveState()
+        c.translate(x, y)
+        c.doForm(name)
+        c.restoreState()
+
+
+# Textos fixos e campos de cada etiqueta
+BRAND_TEXT    = "MAHLE"
+SUBBRAND_TEXT = "MADE IN BRAZIL"
+LABEL_FIELDS  = ('header', 'piece', 'date', 'time', 'code')
+# Etiquetas por folha A4: 15 verticais (5x3) + 2 horizontais
+SHEET_SIZE = A4_SHEET.size
+# Limite do campo "Total etiquetas" da interface
+MAX_LABELS = 9999
+# Constantes de desenho que entram no digest do cache de PDFs
+RENDER_CONSTANTS = (LABEL_W, LABEL_H, BARCODE_BAR_WIDTH, BARCODE_HEIGHT, BARCODE_MAX_WIDTH)
+# Caixa do form da parte fixa da etiqueta: não recorta nada (14400 pt é o
+# maior lado de página do PDF), então cliente ou peça longos que passam da
+# borda saem iguais na primeira etiqueta, desenhada direto, e nas repetidas
+STATIC_BBOX = (-14400, -14400, 14400, 14400)
+# Fonte TrueType dos textos das etiquetas (ver label_fonts)
+FONT_ENV = 'ETIQUETAS_FONT'
+# Altura (px) da logo no preview: DAF/IVECO (logo grande) x demais
+PREVIEW_LOGO_PX = {True: 40, False: 16}
+# Endereço padrão do modo serviço usado pela interface, se definido
+SERVICE_ENV = 'ETIQUETAS_SERVICE'
+# Espera (ms) após a última edição antes de redesenhar o preview
+PREVIEW_DELAY_MS = 150
+# Intervalo (ms) de leitura do progresso da geração em segundo plano
+GEN_POLL_MS = 100
+
+
+@lru_cache(maxsize=None)
+def _register_fonts(spec):
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    regular, _, bold = spec.partition(os.pathsep)
+    names = []
+    for path in (regular, bold or regular):
+        name = 'Etiqueta-' + Path(path).stem
+        if name not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont(name, path))
+        names.append(name)
+    return tuple(names)
+
+
+def label_fonts():
+    """Fontes (normal, negrito) dos textos das etiquetas.
+
+    Com ETIQUETAS_FONT=normal.ttf[<os.pathsep>negrito.ttf], registra a fonte
+    TrueType corporativa; o ReportLab embute no PDF só o subconjunto de
+    glifos usados, uma vez por documento. Sem ela, Helvetica padrão.
+    """
+    spec = os.environ.get(FONT_ENV)
+    if not spec:
+        return 'Helvetica', 'Helvetica-Bold'
+    return _register_fonts(spec)
+
+
+def render_constants():
+    """RENDER_CONSTANTS mais a fonte TrueType em uso (caminho e conteúdo), para o digest."""
+    spec = os.environ.get(FONT_ENV) or ''
+    return RENDER_CONSTANTS + tuple((p, file_digest(p)) for p in spec.split(os.pathsep) if p)
+
+
+def draw_label(c, logos, placed, brand):
+    """Desenha uma etiqueta com origem no canto inferior esquerdo atual.
+
+    `placed` é o layout.PlacedLabel da etiqueta, `brand` o layout.BrandBlock
+    dos textos fixos e `logos` o PdfLogoForms do documento. Logo e textos
+    (tudo menos o código) vão para um form compartilhado quando se repetem,
+    como nas etiquetas de uma sequência; só o código é desenhado por etiqueta.
+    """
+    et_w = LABEL_W
+    cds = placed.label['code']
+    key = ('fixo', placed.label.get('logo'), placed.big, brand,
+           *(placed.label[nm] for nm in LABEL_FIELDS[:4]))
+    logos.repeated(key, STATIC_BBOX, lambda: _draw_static(c, logos, placed, brand))
+    with stage('pdf.barcode'):
+        bc, scale = BARCODE_CACHE.for_pdf(str(cds))
+        bc_w, bc_h = bc.width*scale, BARCODE_HEIGHT
+        bc_x, bc_y = et_w-bc_w-5*mm, 6*mm
+        c.saveState()
+        c.translate(bc_x, bc_y)
+        c.scale(scale,1)
+        bc.drawOn(c,0,0)
+        c.restoreState()
+        c.setFont(brand.bold,7.5)
+        c.drawCentredString(bc_x+bc_w/2, bc_y+bc_h+2*mm, cds)
+
+
+def _draw_static(c, logos, placed, brand):
+    """Parte da etiqueta que não depende do código: logo e textos."""
+    logo = placed.label.get('logo')
+    if logo and os.path.exists(logo):
+        with stage('pdf.logo'):
+            logos.draw(logo, *placed.logo_box)
+    with stage('pdf.text'):
+        _draw_texts(c, placed, brand)
+
+
+def _draw_texts(c, placed, brand):
+    """Textos da etiqueta: cliente, peça, marca, data e hora."""
+    et_h = LABEL_H
+    hdr, pce, dte, tme = [placed.label[nm] for nm in LABEL_FIELDS[:4]]
+    if placed.header_pos:
+        c.setFont(brand.bold,12)
+        c.drawString(*placed.header_pos, hdr)
+    pce_x = placed.piece_x
+    c.setFont(brand.regular,8);     c.drawString(pce_x, et_h-12*mm, pce)
+    c.setFont(brand.bold,8);        c.drawString(pce_x, et_h-16*mm, 'SHROUD')
+    c.setFont(brand.bold,9)
+    c.drawCentredString(brand.center_x, brand.brand_y, brand.brand_text)
+    c.setFont(brand.regular,7)
+    c.drawCentredString(brand.center_x, brand.subbrand_y, brand.subbrand_text)
+    c.setFont(brand.bold,7.5);      c.drawString(2*mm, et_h-23*mm, f'DATA: {dte}')
+    c.drawString(2*mm, et_h-28*mm, f'HORA: {tme}')
+
+
+def draw_sheet(c, logos, labels, brand_text=BRAND_TEXT, subbrand_text=SUBBRAND_TEXT,
+               template=A4_SHEET):
+    """Desenha até template.size etiquetas na página atual.
+
+    Com o modelo padrão, as 15 primeiras ocupam a grade vertical
+    (rotacionadas 90°) e as 2 últimas ficam na horizontal abaixo dela. Em
+    modelos com outro tamanho de etiqueta o desenho é escalado.
+    """
+    with stage('layout'):
+        brand = brand_block(brand_text, subbrand_text, *label_fonts())
+        placed_labels = place_labels(labels, template)
+    scale = template.scale
+    for placed in placed_labels:
+        slot = placed.slot
+        c.saveState()
+        c.translate(slot.x, slot.y)
+        if slot.rotation:
+            c.rotate(slot.rotation)
+        if scale != (1, 1):
+            c.scale(*scale)
+        draw_label(c, logos, placed, brand)
+        c.restoreState()
+
+
+def expand_groups(groups):
+    """Lista de etiquetas a partir de pares (etiqueta, quantidade), na ordem dos grupos."""
+    return [label for label, count in groups for _ in range(max(0, count))]
+
+
+def sequence_labels(groups, counters, start=1):
+    """Como expand_groups, mas numera os grupos cujo código é um padrão {seq}.
+
+    Os números vêm de `counters` (serials.CounterStore), reservados antes de
+    qualquer renderização. Retorna (etiquetas, faixas), com as faixas
+    [(primeiro código, último código)] de cada grupo numerado.
+    """
+    labels, ranges = [], []
+    for label, count in groups:
+        if count <= 0:
+            continue
+        if not is_pattern(label['code']):
+            labels.extend(expand_groups([(label, count)]))
+            continue
+        first = counters.reserve(label['code'], count, start)
+        seq = codes(label['code'], first, count)
+        labels.extend(dict(label, code=code) for code in seq)
+        ranges.append((seq[0], seq[-1]))
+    return labels, ranges
+
+
+def label_from_record(fields, clients_map):
+    """Etiqueta a partir dos campos de uma linha (ingest.iter_records), com a logo do cliente."""
+    return dict(fields, logo=clients_map.get(fields['header']))
+
+
+def build_logo_bundle(clients_map, out=BUNDLE_PATH, dpi=300):
+    """Compila as logos do clients.json num pacote com as variantes de preview e PDF.
+
+    Cada cliente ganha só os tamanhos que a regra da logo grande (DAF/IVECO)
+    lhe dá. Retorna (logos, variantes).
+    """
+    cache = LogoCache()     # sem pacote: sempre parte das imagens originais
+    images = {}
+    for client, path in clients_map.items():
+        if not path or not os.path.exists(path):
+            continue
+        big = is_big_logo(client)
+        height_px = PREVIEW_LOGO_PX[big]
+        _, _, box_w, box_h = place_label({'header': client}).logo_box
+        variants = images.setdefault(path, {})
+        variants[preview_key(height_px)] = cache.for_preview(path, height_px)
+        if not is_vector(path):
+            # Logos vetoriais vão para o PDF como caminhos, não como bitmap
+            variants[pdf_key(*cache.pdf_pixels(box_w, box_h, dpi), dpi)] = \
+                cache.for_pdf(path, box_w, box_h, dpi)
+    # O arquivo mapeado não pode ser substituído no Windows
+    if os.path.abspath(out) == os.path.abspath(LOGO_BUNDLE.path):
+        LOGO_BUNDLE.close()
+    return len(images), write_bundle(out, images, clients_map)
+
+
+def load_clients(path='clients.json'):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class Cancelled(Exception):
+    """A geração foi cancelada antes de salvar o PDF."""
+
+
+def render_labels(labels, out, brand_text=BRAND_TEXT, subbrand_text=SUBBRAND_TEXT,
+                  progress=None, cancel=None, template=A4_SHEET):
+    """Gera um PDF com as etiquetas dadas, paginando template.size por folha.
+
+    `labels` pode ser qualquer iterável de dicts de etiqueta; apenas uma
+    folha fica em memória por vez. `progress(paginas, etiquetas)` é chamado a
+    cada folha concluída; se `cancel` (threading.Event) for sinalizado, a
+    geração para entre folhas com Cancelled e nada é gravado. Sem nenhuma
+    etiqueta, levanta ValueError em vez de gravar um PDF sem páginas.
+    Retorna o total de etiquetas.
+    """
+    from reportlab.pdfgen import canvas as pdf_canvas
+    c = pdf_canvas.Canvas(out, pagesize=template.page, pageCompression=1)
+    logos = PdfLogoForms(c)
+    pages, total = 0, 0
+
+    def flush(page):
+        nonlocal pages
+        if cancel is not None and cancel.is_set():
+            raise Cancelled()
+        with stage('pdf.sheet'):
+            draw_sheet(c, logos, page, brand_text, subbrand_text, template)
+            c.showPage()
+        pages += 1
+        if progress:
+            progress(pages, total)
+
+    page = []
+    for label in labels:
+        page.append(label)
+        total += 1
+        if len(page) == template.size:
+            flush(page)
+            page = []
+    if page:
+        flush(page)
+    if not total:
+        raise ValueError('Nenhuma etiqueta para gerar')
+    with stage('pdf.save'):
+        c.save()
+    return total
+
+
+def render_pdf_bytes(labels, brand_text=BRAND_TEXT, subbrand_text=SUBBRAND_TEXT,
+                     template=A4_SHEET):
+    """Como render_labels, mas devolve o PDF em memória (usado pelo modo serviço)."""
+    import io
+    buf = io.BytesIO()
+    render_labels(labels, buf, brand_text, subbrand_text, template=template)
+    return buf.getvalue()
+
+
+def render_via_service(address, groups, out, brand_text=BRAND_TEXT, subbrand_text=SUBBRAND_TEXT,
+                       template=A4_SHEET, cancel=None, start=1):
+    """Pede o PDF dos grupos [(etiqueta, quantidade)] ao modo serviço (service.py).
+
+    Os códigos sequenciais são numerados pelos contadores do serviço.
+    Grava o PDF em `out` e retorna as faixas numeradas, ou None se o
+    serviço não responder ou recusar o trabalho por tamanho ou fila cheia,
+    para a geração seguir localmente; outros erros devolvidos pelo serviço
+    são propagados. Trabalhos com códigos sequenciais nunca seguem
+    localmente: os contadores da estação não conhecem os números que o
+    serviço já emitiu, então a falha é levantada como ServiceError.
+    """
+    import service
+    sequential = any(is_pattern(label['code']) for label, _ in groups)
+    try:
+        pdf, ranges = service.request_pdf(address, groups, brand_text, subbrand_text,
+                                          template.name, start)
+    except OSError as e:
+        if sequential:
+            raise service.ServiceError(f'Serviço {address} indisponível; códigos '
+                                       f'sequenciais só são numerados pelo serviço: {e}')
+        print(f'Serviço {address} indisponível, gerando localmente:', e)
+        return None
+    except service.ServiceError as e:
+        if sequential or e.status not in (413, 503):
+            raise
+        print(f'Serviço {address} recusou o trabalho, gerando localmente:', e)
+        return None
+    if cancel is not None and cancel.is_set():
+        raise Cancelled()
+    with open(out, 'wb') as f:
+        f.write(pdf)
+    return ranges
+
+
+def labels_digest(labels, brand_text=BRAND_TEXT, subbrand_text=SUBBRAND_TEXT, template=A4_SHEET):
+    """Digest do PDF que render_labels geraria para estas etiquetas (ver sheetcache)."""
+    payload = [[label[nm] for nm in LABEL_FIELDS] + [label.get('logo')] for label in labels]
+    return render_digest(payload, [label.get('logo') for label in labels],
+                         brand_text, subbrand_text, template, render_constants())
+
+
+def render_cached(cache, digest, out, render):
+    """Copia o PDF do cache se houver; senão chama render() e guarda o resultado.
+
+    Retorna True quando o PDF veio do cache.
+    """
+    if cache is not None and cache.fetch(digest, out):
+        return True
+    render()
+    if cache is not None:
+        cache.put(digest, out)
+    return False
+
+
+def render_batch(records, out, clients_map, brand_text=BRAND_TEXT, subbrand_text=SUBBRAND_TEXT,
+                 template=A4_SHEET):
+    """Gera um único PDF com todas as linhas da planilha (ver render_labels).
+
+    `records` são dicts de campos, como os produzidos por ingest.iter_records.
+    """
+    labels = (label_from_record(fields, clients_map) for fields in records)
+    return render_labels(labels, out, brand_text, subbrand_text, template=template)
+
+
+def open_file(path):
+    """Abre o arquivo no visualizador padrão do sistema."""
+    try:
+        os.startfile(path)
+    except:
+        try:
+            subprocess.call(['xdg-open', path])
+        except OSError:
+            pass
+
+
+def _chunks(rows, size):
+    it = iter(rows)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _render_chunk(*args):
+    """render_batch num processo do pool; devolve também os tempos das etapas do bloco."""
+    TIMINGS.reset()
+    n = render_batch(*args)
+    return n, TIMINGS.totals()
+
+
+def render_batch_parallel(records, out, clients_map, workers=None, pages_per_chunk=20,
+                          brand_text=BRAND_TEXT, subbrand_text=SUBBRAND_TEXT, template=A4_SHEET):
+    """Como render_batch, mas renderiza blocos de páginas em vários processos.
+
+    Cada bloco de `pages_per_chunk` folhas vira um PDF temporário num
+    ProcessPoolExecutor; os blocos são unidos na ordem original das linhas.
+    No máximo 2 blocos por worker ficam pendentes, então a leitura das
+    linhas continua incremental. Requer o pacote opcional pypdf.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    try:
+        from pypdf import PdfWriter
+    except ImportError:
+        raise RuntimeError('Renderização paralela requer o pacote pypdf (pip install pypdf)')
+    workers = workers or os.cpu_count() or 1
+    chunk_size = template.size * pages_per_chunk
+    writer = PdfWriter()
+    total = 0
+    with tempfile.TemporaryDirectory() as tmp, ProcessPoolExecutor(workers) as ex:
+        pending = deque()
+
+        def merge_next():
+            nonlocal total
+            path, fut = pending.popleft()
+            n, timings = fut.result()
+            total += n
+            TIMINGS.merge(timings)
+            writer.append(path)
+
+        for n, chunk in enumerate(_chunks(records, chunk_size)):
+            path = os.path.join(tmp, f'{n:06d}.pdf')
+            pending.append((path, ex.submit(_render_chunk, chunk, path, clients_map,
+                                            brand_text, subbrand_text, template)))
+            if len(pending) >= 2*workers:
+                merge_next()
+        while pending:
+            merge_next()
+        # Cada bloco embute suas próprias logos; remove as cópias repetidas
+        writer.compress_identical_objects()
+        with open(out, 'wb') as f:
+            writer.write(f)
+    return total
+
 
 class EtiquetaApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, service=None):
         super().__init__()
         self.title("Gerador de Etiquetas")
         self.resizable(False, False)
@@ -30,13 +685,15 @@ class EtiquetaApp(tk.Tk):
 
         # Configurações básicas
         self.output_dir    = str(Path.home() / "Documents")
-        self.brand_text    = "MAHLE"
-        self.subbrand_text = "MADE IN BRAZIL"
+        self.brand_text    = BRAND_TEXT
+        self.subbrand_text = SUBBRAND_TEXT
 
         # Variáveis de controle
-        self.total_var      = tk.IntVar(value=17)
+        self.total_var      = tk.IntVar(value=SHEET_SIZE)
         self.use_groups_var = tk.BooleanVar(value=False)
         self.group1_count   = tk.IntVar(value=8)
+        # Primeiro número dos códigos sequenciais (Código = US873{seq:03d})
+        self.seq_start_var  = tk.IntVar(value=1)
 
         # Dados dos grupos
         for i in (1, 2):
@@ -52,17 +709,29 @@ class EtiquetaApp(tk.Tk):
         self.H_px  = int(34 * self.px_mm)
 
         # Carrega clients.json com logos
-        try:
-            with open('clients.json', 'r', encoding='utf-8') as f:
-                self.clients_map = json.load(f)
-        except:
-            self.clients_map = {}
+        self.clients_map = load_clients()
         self.logo_paths = {1: None, 2: None}
+        # Estado do preview: redesenho agendado e entradas de cada elemento
+        self._preview_job = None
+        self._preview_inputs = {}
+        # Geração do PDF em segundo plano
+        self._gen_thread = None
+        self._gen_cancel = None
+        self._gen_queue  = queue.Queue()
+        self.sheet_cache = SheetCache()
+        # Modelo de folha usado pelo PDF (ver templates.json / layout.py)
+        self.template    = A4_SHEET
+        # Endereço do modo serviço (service.py); None gera o PDF localmente
+        self.service     = service
+        # Contadores dos códigos sequenciais já usados
+        self.counters    = CounterStore()
+        self._gen_ranges = []
 
         # Monta interface
         self._build_ui()
         self._bind_events()
-        self._draw_previews()
+        # Primeiro preview só depois que a janela aparece
+        self.after_idle(self._draw_previews)
         self._update_group_spin()
 
     def _build_ui(self):
@@ -95,12 +764,12 @@ class EtiquetaApp(tk.Tk):
 
         # Controles gerais
         ttk.Label(frm, text="Total etiquetas:").grid(row=row_offset, column=0, sticky='e', pady=(0,4))
-        Spinbox(frm, from_=1, to=17, textvariable=self.total_var, width=5).grid(row=row_offset, column=1, pady=(0,4))
+        Spinbox(frm, from_=1, to=MAX_LABELS, textvariable=self.total_var, width=5).grid(row=row_offset, column=1, pady=(0,4))
         ttk.Checkbutton(frm, text="Usar 2 grupos", variable=self.use_groups_var,
                         command=self._toggle_groups).grid(row=row_offset+1, column=0, columnspan=2, pady=(0,6))
         # Campo Qtd grupo 1 destacado, em linha separada
         self.lbl_qtd = ttk.Label(frm, text="Qtd grupo 1:", foreground="#000000", font=("Helvetica", 10, "bold"))
-        self.spin1 = Spinbox(frm, from_=1, to=99, textvariable=self.group1_count, width=5)
+        self.spin1 = Spinbox(frm, from_=1, to=MAX_LABELS-1, textvariable=self.group1_count, width=5)
         grupo_row = row_offset+2
         self.lbl_qtd.grid(row=grupo_row, column=0, sticky='e', pady=(0,8))
         self.spin1.grid(row=grupo_row, column=1, pady=(0,8))
@@ -118,6 +787,12 @@ class EtiquetaApp(tk.Tk):
         self._entry_group(self.g2, 2)
         next_row += 1
 
+        # Início da sequência, para códigos como US873{seq:03d}
+        ttk.Label(frm, text="Início sequência:").grid(row=next_row, column=0, sticky='e', pady=(0,4))
+        Spinbox(frm, from_=0, to=10**9, textvariable=self.seq_start_var, width=8).grid(
+            row=next_row, column=1, pady=(0,4))
+        next_row += 1
+
         # Pasta e botões
         ttk.Button(frm, text="Salvar em...", command=self._choose_folder).grid(row=next_row, column=0, pady=5)
         self.lbl_folder = ttk.Label(frm, text=self.output_dir, width=30, anchor='w')
@@ -125,8 +800,16 @@ class EtiquetaApp(tk.Tk):
         next_row += 1
         bf = ttk.Frame(frm)
         bf.grid(row=next_row, column=0, columnspan=2, pady=10)
-        ttk.Button(bf, text="Gerar PDF", command=self.on_generate).pack(side='left', padx=5)
+        self.btn_generate = ttk.Button(bf, text="Gerar PDF", command=self.on_generate)
+        self.btn_generate.pack(side='left', padx=5)
+        self.btn_cancel = ttk.Button(bf, text="Cancelar", command=self._cancel_generation, state='disabled')
+        self.btn_cancel.pack(side='left', padx=(0,5))
         ttk.Button(bf, text="Sair", command=self.destroy).pack(side='left')
+        next_row += 1
+        # Progresso da geração em segundo plano
+        self.progress = ttk.Progressbar(frm, mode='determinate')
+        self.progress.grid(row=next_row, column=0, columnspan=2, sticky='ew', pady=(0,5))
+        self.progress.grid_remove()
 
         # Canvas de preview
         self.canvas1 = tk.Canvas(prw, width=self.W_px, height=self.H_px, bg='white')
@@ -134,7 +817,8 @@ class EtiquetaApp(tk.Tk):
         self.canvas2 = tk.Canvas(prw, width=self.W_px, height=self.H_px, bg='white')
         self.canvas2.grid(row=1, column=1, padx=5)
 
-        self._toggle_groups()
+        # Sem redesenhar: o primeiro preview vem do after_idle do __init__
+        self._toggle_groups(draw=False)
 
     def _entry_group(self, parent, grp):
         fields = [
@@ -172,11 +856,12 @@ class EtiquetaApp(tk.Tk):
             self.header1_var, self.piece1_var, self.date1_var,
             self.time1_var, self.code1_var,
             self.header2_var, self.piece2_var, self.date2_var,
-            self.time2_var, self.code2_var
+            self.time2_var, self.code2_var, self.seq_start_var
         ]:
-            v.trace_add('write', lambda *a: self._draw_previews())
+            v.trace_add('write', lambda *a: self._schedule_previews())
+        self.total_var.trace_add('write', lambda *a: self._update_group_spin())
 
-    def _toggle_groups(self):
+    def _toggle_groups(self, draw=True):
         if self.use_groups_var.get():
             self.g2.grid()
             self.spin1.config(state='normal')
@@ -190,7 +875,8 @@ class EtiquetaApp(tk.Tk):
             self.spin1.grid_remove()
             self.canvas2.grid_remove()
         self._update_group_spin()
-        self._draw_previews()
+        if draw:
+            self._draw_previews()
 
     def _choose_folder(self):
         d = filedialog.askdirectory(initialdir=self.output_dir)
@@ -199,59 +885,79 @@ class EtiquetaApp(tk.Tk):
             self.lbl_folder.config(text=d)
 
     def _update_group_spin(self):
-        m = max(1, self.total_var.get()-1)
-        # Força sempre 17
-        m = 16
+        try:
+            m = max(1, self.total_var.get()-1)
+        except tk.TclError:
+            # Campo vazio ou incompleto durante a digitação
+            return
         self.spin1.config(to=m)
         if self.group1_count.get() > m:
             self.group1_count.set(m)
 
+    def _schedule_previews(self):
+        # Agrupa rajadas de edição (digitação) num único redesenho
+        if self._preview_job is not None:
+            self.after_cancel(self._preview_job)
+        self._preview_job = self.after(PREVIEW_DELAY_MS, self._draw_previews)
+
     def _draw_previews(self):
+        if self._preview_job is not None:
+            self.after_cancel(self._preview_job)
+            self._preview_job = None
         self._draw_canvas(self.canvas1, 1)
         if self.use_groups_var.get():
             self._draw_canvas(self.canvas2, 2)
 
+    def _preview_changed(self, canvas, grp, key, inputs):
+        """True se as entradas do elemento `key` mudaram desde o último desenho.
+
+        Nesse caso os itens antigos (marcados com a tag `key`) são apagados
+        para serem redesenhados; senão o elemento fica como está.
+        """
+        last = self._preview_inputs.setdefault(grp, {})
+        if key in last and last[key] == inputs:
+            return False
+        canvas.delete(key)
+        last[key] = inputs
+        return True
+
     def _draw_canvas(self, canvas, grp):
+        with stage('preview'):
+            self._draw_canvas_items(canvas, grp)
+
+    def _draw_canvas_items(self, canvas, grp):
         c = canvas
-        c.delete('all')
         # Logo à esquerda, nome do cliente e subtexto à direita, todos na mesma linha no topo
         path = self.logo_paths.get(grp)
         hdr = getattr(self, f'header{grp}_var').get()
         is_daf = hdr.strip().upper().startswith('DAF')
         is_iveco = hdr.strip().upper().startswith('IVECO')
-        logo_h_px = 40 if (is_daf or is_iveco) else 16  # DAF e IVECO maior, demais menor
+        logo_h_px = PREVIEW_LOGO_PX[is_daf or is_iveco]  # DAF e IVECO maior, demais menor
         brand = self.brand_text
         subbrand = self.subbrand_text
         right_margin = 8
         text_x = self.W_px - right_margin
         ox_px = 2
         logo_w_px = 0
+        logo_key = None
         if path and os.path.exists(path):
-            orig = Image.open(path).convert('RGBA')
-            # Compor sobre branco puro, eliminando qualquer pixel parcialmente transparente
-            white_bg = Image.new('RGBA', orig.size, (255,255,255,255))
-            white_bg.paste(orig, mask=orig.split()[3])
-            # Força todos pixels não totalmente opacos para branco
-            arr = white_bg.getdata()
-            new_arr = [(r,g,b,255) if a==255 else (255,255,255,255) for (r,g,b,a) in arr]
-            white_bg.putdata(new_arr)
-            # Converte para RGB antes de redimensionar (elimina canal alfa)
-            rgb_logo = white_bg.convert('RGB')
-            w, h = rgb_logo.size
-            new_h = logo_h_px
-            new_w = int(w * new_h / h)
-            img = rgb_logo.resize((new_w, new_h), Image.LANCZOS)
-            photo = ImageTk.PhotoImage(img)
-            setattr(self, f'logo_img{grp}', photo)
-            c.create_image(ox_px, 5, anchor='nw', image=photo)
-            logo_w_px = new_w
-        # ...existing code...
-        c.create_text(text_x, 7, text=brand, font=('Helvetica',12,'bold'), anchor='ne')
-        c.create_text(text_x, 22, text=subbrand, font=('Helvetica',8), anchor='ne')
+            img = LOGO_CACHE.for_preview(path, logo_h_px)
+            logo_w_px = img.width
+            logo_key = (path, os.path.getmtime(path), logo_h_px)
+        if self._preview_changed(c, grp, 'logo', logo_key) and logo_key:
+            from PIL import ImageTk
+            with stage('preview.logo'):
+                photo = ImageTk.PhotoImage(img)
+                setattr(self, f'logo_img{grp}', photo)
+                c.create_image(ox_px, 5, anchor='nw', image=photo, tags='logo')
+        if self._preview_changed(c, grp, 'brand', (brand, subbrand)):
+            c.create_text(text_x, 7, text=brand, font=('Helvetica',12,'bold'), anchor='ne', tags='brand')
+            c.create_text(text_x, 22, text=subbrand, font=('Helvetica',8), anchor='ne', tags='brand')
         # Só mostra nome do cliente se não for DAF ou IVECO
-        if not (is_daf or is_iveco):
+        show_hdr = not (is_daf or is_iveco)
+        if self._preview_changed(c, grp, 'hdr', (hdr, show_hdr, logo_w_px, logo_h_px)) and show_hdr:
             hdr_x = ox_px + logo_w_px + 8  # 8px de espaço após logo
-            c.create_text(hdr_x, 7 + logo_h_px//2, text=hdr, font=('Helvetica',12,'bold'), anchor='w')
+            c.create_text(hdr_x, 7 + logo_h_px//2, text=hdr, font=('Helvetica',12,'bold'), anchor='w', tags='hdr')
         # Se for DAF ou IVECO, não desenha o nome do cliente, apenas a logo
         # Demais textos
         # Ajusta textos da direita para não encostarem na borda
@@ -274,252 +980,342 @@ class EtiquetaApp(tk.Tk):
             'tim':    ('Helvetica',7,'bold')
         }
         for k,(x,y) in coords.items():
-            c.create_text(x*self.px_mm, y*self.px_mm, text=values[k], font=fonts[k], anchor='nw')
+            if self._preview_changed(c, grp, k, values[k]):
+                c.create_text(x*self.px_mm, y*self.px_mm, text=values[k], font=fonts[k], anchor='nw', tags=k)
         # Preview barcode
+        val = getattr(self, f'code{grp}_var').get() or '0000000'
+        if is_pattern(val):
+            # Sequência: mostra o próximo código que seria gerado (com o serviço,
+            # os contadores ficam no servidor e o preview mostra o início)
+            try:
+                first = (self._seq_start() if self.service
+                         else self.counters.next(val, self._seq_start()))
+                val = codes(val, first, 1)[0]
+            except (PatternError, ValueError, IndexError, KeyError):
+                pass
+        if not self._preview_changed(c, grp, 'bc', val):
+            return
+        # Barras desenhadas como retângulos, na mesma geometria do PDF
         try:
-            val = getattr(self, f'code{grp}_var').get() or '0000000'
-            buf = BytesIO()
-            bc  = BC128(str(val), writer=ImageWriter())
-            bc.write(buf, {'module_width':0.2,'module_height':10,'font_size':8,'text_distance':1,'quiet_zone':1})
-            buf.seek(0)
-            pil = Image.open(buf).convert('RGBA')
-            pil = pil.resize((int(self.W_px*0.65), pil.height), Image.LANCZOS)
-            photo_bc = ImageTk.PhotoImage(pil)
-            setattr(self, f'bc_img{grp}', photo_bc)
-            x = self.W_px - pil.width - 2*self.px_mm
-            y = int(self.H_px * 0.55)
-            c.create_image(x, y, anchor='nw', image=photo_bc)
-            # Legenda do código de barras sempre aparece abaixo
-            legend_y = y + pil.height + 8  # espaço extra para garantir visibilidade
-            c.create_text(x + pil.width/2, legend_y, text=val, font=('Helvetica',8), anchor='n')
+            with stage('preview.barcode'):
+                k = self.px_mm / mm
+                bars, bc_w = BARCODE_CACHE.bars(str(val))
+                x = self.W_px - (bc_w + 5*mm)*k
+                y_bottom = self.H_px - 6*mm*k
+                y = y_bottom - BARCODE_HEIGHT*k
+                for bx, bw in bars:
+                    c.create_rectangle(x + bx*k, y, x + (bx+bw)*k, y_bottom,
+                                       fill='black', width=0, tags='bc')
+                # Legenda acima das barras, como no PDF
+                c.create_text(x + bc_w*k/2, y - 2*mm*k, text=val, font=('Helvetica',8), anchor='s', tags='bc')
         except Exception as e:
             print('Erro preview barcode:', e)
 
     def _lookup_to_groups(self):
-        f = filedialog.askopenfilename(title='Excel', filetypes=[('Excel','.xlsx;.xls')])
+        f = filedialog.askopenfilename(title='Excel', filetypes=[('Excel','.xlsx;.xls;.csv')])
         if not f: return
+        n_groups = 2 if self.use_groups_var.get() else 1
         try:
-            df = pd.read_excel(f)
+            records = [fields for _, fields in itertools.islice(iter_records(f), n_groups)]
         except Exception as e:
             messagebox.showerror('Erro Excel', str(e))
             return
-        if df.empty:
+        if not records:
             messagebox.showinfo('Excel','vazio')
             return
-        rows = [df.iloc[0]]
-        if self.use_groups_var.get() and len(df) >= 2:
-            rows.append(df.iloc[1])
-        for idx, row in enumerate(rows, start=1):
-            mapping = {
-                'Cliente': f'header{idx}_var',
-                'Peça':    f'piece{idx}_var',
-                'Data':    f'date{idx}_var',
-                'Hora':    f'time{idx}_var',
-                'Código':  f'code{idx}_var'
-            }
-            for col, varname in mapping.items():
-                v = row.get(col, '')
-                if col in ('Data','Hora') and hasattr(v, 'strftime'):
-                    v = v.strftime('%d/%m/%Y') if col=='Data' else v.strftime('%H:%M:%S')
-                getattr(self, varname).set(str(v))
+        for idx, fields in enumerate(records, start=1):
+            for nm in LABEL_FIELDS:
+                getattr(self, f'{nm}{idx}_var').set(fields[nm])
+            self.logo_paths[idx] = self.clients_map.get(fields['header'])
         self._draw_previews()
 
     def on_generate(self):
+        # Todos os grupos ativos, como o modo serviço confere
+        for grp in ((1, 2) if self.use_groups_var.get() else (1,)):
+            try:
+                datetime.strptime(getattr(self, f'date{grp}_var').get(), DATE_FORMAT)
+                datetime.strptime(getattr(self, f'time{grp}_var').get(), TIME_FORMAT)
+            except:
+                messagebox.showerror('Erro', f'Data/Hora inválidas (grupo {grp})')
+                return
         try:
-            datetime.strptime(self.date1_var.get(), '%d/%m/%Y')
-            datetime.strptime(self.time1_var.get(), '%H:%M:%S')
-        except:
-            messagebox.showerror('Erro','Data/Hora inválidas')
+            total, g1 = self.total_var.get(), self.group1_count.get()
+        except tk.TclError:
+            messagebox.showerror('Erro','Quantidade inválida')
             return
-        if self.use_groups_var.get() and self.group1_count.get() >= self.total_var.get():
+        if total < 1 or (self.use_groups_var.get() and not 1 <= g1 < total):
             messagebox.showerror('Erro','Configuração inválida')
             return
         self._generate_pdf()
 
-    def _generate_pdf(self):
-        total = 17
+    def _snapshot_groups(self):
+        """Copia os campos dos grupos para pares (dict, quantidade), usados fora da thread Tk."""
+        total = self.total_var.get()
         g1    = self.group1_count.get() if self.use_groups_var.get() else total
-        out   = os.path.join(self.output_dir, 'etiquetas.pdf')
-        c     = pdf_canvas.Canvas(out, pagesize=A4)
-        # Dimensões e espaçamentos
-        et_w, et_h = 74*mm, 34*mm
-        slot_w, slot_h = et_h, et_w
-        cols, rows_per = 5, 3
-        ml, mt, gh, gv = 13*mm, 12*mm, 3*mm, 3*mm
-        bw, bh, maxw, rot = 0.6*mm, 10*mm, 47*mm, 90
-        # Nova lógica: total de etiquetas = 17
-        # Qtd grupo 1 = g1, o restante é grupo 2
-        # Distribui tipo: primeiro verticais, depois horizontais
-        hor_w, hor_h = 74*mm, 34*mm
-        gap = 3*mm
-        verticais_base_y = A4[1] - mt - rows_per*slot_h - (rows_per-1)*gv
-        hor_y = verticais_base_y - hor_h - gap
-        total_w = 2*hor_w + gap
-        start_x = (A4[0]-total_w)/2
-        # Sempre gera 2 horizontais, o resto verticais
-        n_horizontais = 2
-        n_verticais = 15
         # Grupos: primeiros g1 etiquetas são grupo 1, o resto grupo 2
-        grupos = [1]*g1 + [2]*(17-g1)
-        # Verticais (primeiros n_verticais)
-        for idx in range(n_verticais):
-            grp = grupos[idx]
-            hdr,pce,dte,tme,cds = [getattr(self, f'{nm}{grp}_var').get() for nm in ('header','piece','date','time','code')]
-            is_daf = hdr.strip().upper().startswith('DAF')
-            is_iveco = hdr.strip().upper().startswith('IVECO')
-            logo_h_mm = 12*mm if (is_daf or is_iveco) else 6*mm
-            logo_w_mm = 12*mm if (is_daf or is_iveco) else 6*mm
-            col, row = idx % cols, idx // cols
-            if row >= rows_per:
-                c.showPage()
-                row = 0
-            x0 = ml + col*(slot_w+gh)
-            y0 = A4[1] - mt - (row+1)*slot_h - row*gv
-            c.saveState()
-            c.translate(x0+slot_w/2, y0+slot_h/2)
-            c.rotate(rot)
-            c.translate(-et_w/2, -et_h/2)
-            if not self.use_groups_var.get():
-                logo = self.logo_paths.get(1)
-            else:
-                logo = self.logo_paths.get(grp)
-            logo_drawn = False
-            logo_y = et_h-5*mm-logo_h_mm
-            hdr_y = et_h-5*mm
-            if (is_daf or is_iveco):
-                hdr_x = 2*mm + logo_w_mm
-            else:
-                hdr_x = 2*mm + logo_w_mm + 1*mm
-            if logo and os.path.exists(logo):
-                orig = Image.open(logo).convert('RGBA')
-                white_bg = Image.new('RGBA', orig.size, (255,255,255,255))
-                white_bg.paste(orig, mask=orig.split()[3])
-                arr = white_bg.getdata()
-                new_arr = [(r,g,b,255) if a==255 else (255,255,255,255) for (r,g,b,a) in arr]
-                white_bg.putdata(new_arr)
-                rgb_logo = white_bg.convert('RGB')
-                dpi = 300
-                mm_to_inch = 1/25.4
-                px_w = int(logo_w_mm * mm_to_inch * dpi)
-                px_h = int(logo_h_mm * mm_to_inch * dpi)
-                w, h = rgb_logo.size
-                scale = min(px_w/w, px_h/h)
-                new_h = max(1, int(h * scale))
-                new_w = max(1, int(w * scale))
-                logo_img = rgb_logo.resize((new_w, new_h), Image.LANCZOS)
-                y_logo = hdr_y - logo_h_mm/2
-                c.drawInlineImage(logo_img, 2*mm, y_logo, width=logo_w_mm, height=logo_h_mm)
-            if not (is_daf or is_iveco):
-                c.setFont('Helvetica-Bold',12)
-                c.drawString(hdr_x, hdr_y, hdr)
-            if is_daf or is_iveco:
-                pce_x = 2*mm
-            else:
-                pce_x = hdr_x
-            c.setFont('Helvetica',8);       c.drawString(pce_x, et_h-12*mm, pce)
-            c.setFont('Helvetica-Bold',8);  c.drawString(pce_x, et_h-16*mm, 'SHROUD')
-            c.setFont('Helvetica-Bold',9)
-            brand_w = c.stringWidth(self.brand_text, 'Helvetica-Bold', 9)
-            c.setFont('Helvetica',7)
-            subbrand_w = c.stringWidth(self.subbrand_text, 'Helvetica', 7)
-            max_w = max(brand_w, subbrand_w)
-            center_x = et_w-5*mm - max_w/2
-            brand_y = et_h-7*mm
-            subbrand_y = brand_y - 9
-            c.setFont('Helvetica-Bold',9)
-            c.drawCentredString(center_x, brand_y, self.brand_text)
-            c.setFont('Helvetica',7)
-            c.drawCentredString(center_x, subbrand_y, self.subbrand_text)
-            c.setFont('Helvetica-Bold',7.5); c.drawString(2*mm, et_h-23*mm, f'DATA: {dte}')
-            c.drawString(2*mm, et_h-28*mm, f'HORA: {tme}')
-            bc = code128.Code128(str(cds), barHeight=bh, barWidth=bw)
-            scale = min(1.0, maxw/bc.width)
-            bc_w, bc_h = bc.width*scale, bh
-            bc_x, bc_y = et_w-bc_w-5*mm, 6*mm
-            c.saveState()
-            c.translate(bc_x, bc_y)
-            c.scale(scale,1)
-            bc.drawOn(c,0,0)
-            c.restoreState()
-            c.setFont('Helvetica-Bold',7.5); c.drawCentredString(bc_x+bc_w/2, bc_y+bc_h+2*mm, cds)
-            c.restoreState()
-        # Horizontais (sempre os últimos 2)
-        for idx in range(n_verticais, n_verticais + n_horizontais):
-            i = idx - n_verticais
-            grp = grupos[idx]
-            hdr,pce,dte,tme,cds = [getattr(self, f'{nm}{grp}_var').get() for nm in ('header','piece','date','time','code')]
-            is_daf = hdr.strip().upper().startswith('DAF')
-            is_iveco = hdr.strip().upper().startswith('IVECO')
-            logo_h_mm = 12*mm if (is_daf or is_iveco) else 6*mm
-            logo_w_mm = 12*mm if (is_daf or is_iveco) else 6*mm
-            x = start_x + i*(hor_w+gap)
-            c.saveState()
-            logo = self.logo_paths.get(grp)
-            ox_mm = x+2*mm
-            hdr_y = hor_y+hor_h-5*mm
-            if (is_daf or is_iveco):
-                hdr_x = ox_mm + logo_w_mm
-            else:
-                hdr_x = ox_mm + logo_w_mm + 1*mm
-            if logo and os.path.exists(logo):
-                orig = Image.open(logo).convert('RGBA')
-                white_bg = Image.new('RGBA', orig.size, (255,255,255,255))
-                white_bg.paste(orig, mask=orig.split()[3])
-                arr = white_bg.getdata()
-                new_arr = [(r,g,b,255) if a==255 else (255,255,255,255) for (r,g,b,a) in arr]
-                white_bg.putdata(new_arr)
-                rgb_logo = white_bg.convert('RGB')
-                dpi = 300
-                mm_to_inch = 1/25.4
-                px_w = int(logo_w_mm * mm_to_inch * dpi)
-                px_h = int(logo_h_mm * mm_to_inch * dpi)
-                w, h = rgb_logo.size
-                scale = min(px_w/w, px_h/h)
-                new_w = max(1, int(w * scale))
-                new_h = max(1, int(h * scale))
-                logo_img = rgb_logo.resize((new_w, new_h), Image.LANCZOS)
-                y_logo = hdr_y - logo_h_mm/2
-                c.drawInlineImage(logo_img, ox_mm, y_logo, width=logo_w_mm, height=logo_h_mm)
-            if not (is_daf or is_iveco):
-                c.setFont('Helvetica-Bold',12)
-                c.drawString(hdr_x, hdr_y, hdr)
-            c.setFont('Helvetica-Bold',9)
-            brand_w = c.stringWidth(self.brand_text, 'Helvetica-Bold', 9)
-            c.setFont('Helvetica',7)
-            subbrand_w = c.stringWidth(self.subbrand_text, 'Helvetica', 7)
-            max_w = max(brand_w, subbrand_w)
-            center_x = x+hor_w-5*mm - max_w/2
-            brand_y = hor_y+hor_h-7*mm
-            subbrand_y = brand_y - 9
-            c.setFont('Helvetica-Bold',9)
-            c.drawCentredString(center_x, brand_y, self.brand_text)
-            c.setFont('Helvetica',7)
-            c.drawCentredString(center_x, subbrand_y, self.subbrand_text)
-            if is_daf or is_iveco:
-                pce_x = x+2*mm
-            else:
-                pce_x = hdr_x
-            c.setFont('Helvetica',8);      c.drawString(pce_x, hor_y+hor_h-12*mm, pce)
-            c.setFont('Helvetica-Bold',8); c.drawString(pce_x, hor_y+hor_h-16*mm, 'SHROUD')
-            c.setFont('Helvetica-Bold',7.5); c.drawString(x+2*mm, hor_y+hor_h-23*mm, f'DATA: {dte}')
-            c.drawString(x+2*mm, hor_y+hor_h-28*mm, f'HORA: {tme}')
-            bc = code128.Code128(str(cds), barHeight=bh, barWidth=bw)
-            scale = min(1.0, maxw/bc.width)
-            bc_w, bc_h = bc.width*scale, bh
-            bc_x, bc_y = x+hor_w-bc_w-5*mm, hor_y+6*mm
-            c.saveState()
-            c.translate(bc_x, bc_y)
-            c.scale(scale,1)
-            bc.drawOn(c,0,0)
-            c.restoreState()
-            c.setFont('Helvetica-Bold',7.5); c.drawCentredString(bc_x+bc_w/2, bc_y+bc_h+2*mm, cds)
-            c.restoreState()
-        c.save()
+        groups = []
+        for grp, count in ((1, g1), (2, total-g1)):
+            label = {nm: getattr(self, f'{nm}{grp}_var').get() for nm in LABEL_FIELDS}
+            label['logo'] = self.logo_paths.get(grp)
+            groups.append((label, count))
+        return groups
+
+    def _seq_start(self):
+        try:
+            return max(0, self.seq_start_var.get())
+        except tk.TclError:
+            return 1
+
+    def _generate_pdf(self):
+        if self._gen_thread is not None:
+            return
+        groups = [(label, count) for label, count in self._snapshot_groups() if count > 0]
         try:
-            os.startfile(out)
-        except:
-            subprocess.call(['xdg-open', out])
-        messagebox.showinfo('Concluído', f'PDF salvo em:\n{out}')
+            for label, _ in groups:
+                if is_pattern(label['code']):
+                    check_pattern(label['code'])
+        except PatternError as e:
+            messagebox.showerror('Erro', str(e))
+            return
+        out    = os.path.join(self.output_dir, 'etiquetas.pdf')
+        n_pages = math.ceil(sum(count for _, count in groups) / self.template.size)
+        self._gen_ranges = []
+        self._gen_cancel = threading.Event()
+        self._gen_thread = threading.Thread(
+            target=self._generate_worker,
+            args=(groups, self._seq_start(), out, self.brand_text, self.subbrand_text,
+                  self._gen_cancel, self._gen_queue, self.sheet_cache, self.template,
+                  self.service, self.counters),
+            daemon=True)
+        self.btn_generate.config(state='disabled')
+        self.btn_cancel.config(state='normal')
+        self.progress.config(maximum=n_pages, value=0)
+        self.progress.grid()
+        self._gen_thread.start()
+        self.after(GEN_POLL_MS, self._poll_generation)
+
+    @staticmethod
+    def _generate_worker(groups, start, out, brand_text, subbrand_text, cancel, q, cache=None,
+                         template=A4_SHEET, service=None, counters=None):
+        # Roda fora da thread Tk: só conversa com a interface pela fila
+        try:
+            with stage('generate'):
+                ranges = None
+                if service:
+                    # Com o serviço, os números saem dos contadores do servidor
+                    ranges = render_via_service(service, groups, out, brand_text,
+                                                subbrand_text, template, cancel, start)
+                if ranges is None:
+                    # Local (ou serviço fora do ar, só sem sequência): reserva
+                    # os números da sequência antes de gerar, para nunca se repetirem
+                    labels, ranges = sequence_labels(groups, counters, start)
+                    with stage('cache.digest'):
+                        digest = labels_digest(labels, brand_text, subbrand_text, template)
+                    render_cached(cache, digest, out, lambda: render_labels(
+                        labels, out, brand_text, subbrand_text,
+                        progress=lambda pages, n: q.put(('page', pages)),
+                        cancel=cancel, template=template))
+                q.put(('ranges', ranges))
+        except Cancelled:
+            q.put(('cancelled', out))
+            return
+        except Exception as e:
+            q.put(('error', str(e)))
+            return
+        finally:
+            TIMINGS.dump()
+        open_file(out)
+        q.put(('done', out))
+
+    def _cancel_generation(self):
+        if self._gen_cancel is not None:
+            self._gen_cancel.set()
+            self.btn_cancel.config(state='disabled')
+
+    def _poll_generation(self):
+        finished = None
+        try:
+            while True:
+                msg = self._gen_queue.get_nowait()
+                if msg[0] == 'page':
+                    self.progress.config(value=msg[1])
+                elif msg[0] == 'ranges':
+                    self._gen_ranges = msg[1]
+                else:
+                    finished = msg
+        except queue.Empty:
+            pass
+        if finished is None:
+            self.after(GEN_POLL_MS, self._poll_generation)
+            return
+        self._gen_thread.join()
+        self._gen_thread = None
+        self._gen_cancel = None
+        self.btn_generate.config(state='normal')
+        self.btn_cancel.config(state='disabled')
+        self.progress.grid_remove()
+        kind, info = finished
+        if kind == 'done':
+            series = ''.join(f'\nSequência: {a} a {b}' for a, b in self._gen_ranges)
+            # O preview passa a mostrar o próximo código livre
+            self._draw_previews()
+            messagebox.showinfo('Concluído', f'PDF salvo em:\n{info}{series}')
+        elif kind == 'error':
+            messagebox.showerror('Erro', f'Falha ao gerar o PDF:\n{info}')
+
+
+def select_template(args):
+    """Modelo de folha pedido na linha de comando (--pack ou --template)."""
+    if args.pack:
+        w, _, h = args.pack.lower().partition('x')
+        try:
+            w, h = float(w), float(h)
+        except ValueError:
+            raise SheetError(f'--pack inválido: {args.pack} (use LxA em mm, ex.: 50x25)')
+        if w <= 0 or h <= 0:
+            raise SheetError(f'--pack inválido: {args.pack} (medidas devem ser positivas)')
+        try:
+            return pack_template(w*mm, h*mm)
+        except ValueError as e:
+            raise SheetError(f'--pack {args.pack}: {e}')
+    try:
+        templates = load_templates(args.templates)
+    except ValueError as e:
+        raise SheetError(str(e))
+    try:
+        return templates[args.template]
+    except KeyError:
+        raise SheetError(f'Modelo de folha desconhecido: {args.template} '
+                         f'(disponíveis: {", ".join(templates)})')
+
+
+def run_batch(args):
+    """Modo --batch: valida a planilha inteira e gera um único PDF (ou ZPL)."""
+    clients_map = load_clients(args.clients)
+    cache = None if args.no_cache or args.format != 'pdf' else SheetCache(args.cache_dir)
+    # A planilha entra no digest pelo conteúdo do arquivo, sem relê-la. Só
+    # execuções com validação gravam no cache, então um acerto vale como
+    # planilha já validada ('batch-validado' descarta entradas antigas, que
+    # podiam vir de --no-validate)
+    template = select_template(args)
+    digest = render_digest(['batch-validado', file_digest(args.batch), clients_map],
+                           clients_map.values(), BRAND_TEXT, SUBBRAND_TEXT,
+                           template, render_constants())
+    if cache is not None and cache.fetch(digest, args.output):
+        print(f'PDF reaproveitado do cache, salvo em {args.output}')
+        return 0
+    if not args.no_validate:
+        errors = find_invalid(iter_records(args.batch))
+        if errors:
+            for err in errors:
+                print(err, file=sys.stderr)
+            print(f'{len(errors)} valores inválidos; nenhum PDF gerado', file=sys.stderr)
+            return 1
+    records = (fields for _, fields in iter_records(args.batch))
+    first = next(records, None)
+    if first is None:
+        raise SheetError(f'Planilha sem etiquetas: {args.batch}')
+    records = itertools.chain([first], records)
+    if args.format == 'zpl':
+        import zpl
+        n = zpl.write_zpl((label_from_record(fields, clients_map) for fields in records),
+                          args.output, LOGO_CACHE.flattened, BRAND_TEXT, SUBBRAND_TEXT,
+                          dpmm=args.dpmm)
+        print(f'{n} etiquetas ZPL enviadas para {args.output}')
+        return 0
+    if args.workers == 1:
+        n = render_batch(records, args.output, clients_map, template=template)
+    else:
+        n = render_batch_parallel(records, args.output, clients_map,
+                                  workers=args.workers or None,
+                                  pages_per_chunk=args.pages_per_chunk,
+                                  template=template)
+    if cache is not None and not args.no_validate:
+        cache.put(digest, args.output)
+    print(f'{n} etiquetas salvas em {args.output}')
+    return 0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Gerador de Etiquetas')
+    ap.add_argument('--batch', metavar='PLANILHA',
+                    help='gera o PDF de todas as linhas de um .xlsx/.csv sem abrir a interface')
+    ap.add_argument('-o', '--output', default=None,
+                    help='saída do modo --batch: arquivo, ou tcp://host[:porta] para ZPL '
+                         '(padrão: etiquetas.pdf/.zpl em Documentos)')
+    ap.add_argument('--format', choices=('pdf', 'zpl'), default='pdf',
+                    help='pdf: folhas A4; zpl: etiquetas para impressora térmica')
+    ap.add_argument('--template', default=A4_SHEET.name,
+                    help=f'modelo de folha do PDF (padrão: {A4_SHEET.name})')
+    ap.add_argument('--templates', default='templates.json',
+                    help='arquivo com os modelos de folha (padrão: templates.json)')
+    ap.add_argument('--pack', metavar='LxA',
+                    help='escolhe o modelo que cabe mais etiquetas LxA mm por folha A4 (ex.: 50x25)')
+    ap.add_argument('--dpmm', type=int, default=8,
+                    help='resolução da impressora ZPL em pontos/mm (8 = 203 dpi, 12 = 300 dpi)')
+    ap.add_argument('--clients', default='clients.json',
+                    help='mapa cliente -> logo (padrão: clients.json)')
+    ap.add_argument('--workers', type=int, default=1,
+                    help='processos para renderizar o lote, ou os trabalhos do modo serviço, '
+                         'em paralelo (0 = todos os núcleos)')
+    ap.add_argument('--pages-per-chunk', type=int, default=20,
+                    help='folhas por bloco enviado a cada processo no modo paralelo')
+    ap.add_argument('--no-validate', action='store_true',
+                    help='não valida Data/Hora de todas as linhas antes de gerar')
+    ap.add_argument('--cache-dir', default=None,
+                    help='diretório do cache de PDFs já gerados')
+    ap.add_argument('--no-cache', action='store_true',
+                    help='sempre renderiza, sem consultar nem gravar o cache')
+    ap.add_argument('--build-logos', action='store_true',
+                    help=f'compila as logos do --clients em {BUNDLE_PATH} (tamanhos do '
+                         f'preview e do PDF) e sai')
+    ap.add_argument('--serve', action='store_true',
+                    help='inicia o modo serviço: gera PDFs para as estações por HTTP local')
+    ap.add_argument('--host', default='127.0.0.1',
+                    help='endereço do modo serviço (padrão: 127.0.0.1)')
+    ap.add_argument('--port', type=int, default=8765,
+                    help='porta do modo serviço (padrão: 8765)')
+    ap.add_argument('--socket', metavar='CAMINHO',
+                    help='atende num socket Unix em vez de TCP')
+    ap.add_argument('--service', metavar='ENDEREÇO', default=os.environ.get(SERVICE_ENV),
+                    help='a interface pede o PDF ao modo serviço (http://host:porta ou '
+                         f'unix:/caminho; padrão: variável {SERVICE_ENV})')
+    ap.add_argument('--font', metavar='NORMAL.ttf[%sNEGRITO.ttf]' % os.pathsep,
+                    default=os.environ.get(FONT_ENV),
+                    help='fonte TrueType dos textos, embutida como subconjunto '
+                         f'(padrão: variável {FONT_ENV}, ou Helvetica)')
+    ap.add_argument('--timing', metavar='ARQUIVO.json',
+                    help=f'grava o tempo total de cada etapa da geração em JSON '
+                         f'(o mesmo que a variável {TIMING_ENV})')
+    args = ap.parse_args(argv)
+    if args.font:
+        # Processos do modo paralelo e do serviço herdam pelo ambiente
+        os.environ[FONT_ENV] = args.font
+    if args.timing:
+        TIMINGS.enable(args.timing)
+        # Processos do modo paralelo herdam pelo ambiente
+        os.environ[TIMING_ENV] = args.timing
+    try:
+        if args.build_logos:
+            n, variants = build_logo_bundle(load_clients(args.clients))
+            print(f'{n} logos ({variants} variantes) compiladas em {BUNDLE_PATH}')
+            return 0
+        if args.batch:
+            if args.output is None:
+                args.output = str(Path.home() / 'Documents' / f'etiquetas.{args.format}')
+            try:
+                return run_batch(args)
+            except SheetError as e:
+                print(e, file=sys.stderr)
+                return 1
+        if args.serve:
+            import service
+            return service.run(args)
+        EtiquetaApp(service=args.service).mainloop()
+        return 0
+    finally:
+        TIMINGS.dump()
+
 
 if __name__ == '__main__':
-    EtiquetaApp().mainloop()
\ No newline at end of file
+    sys.exit(main())
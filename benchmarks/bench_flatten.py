@@ -0,0 +1,62 @@
+"""Mede o achatamento de transparência das logos: list comprehension x LUT/composite.
+
+Uso:
+    python benchmarks/bench_flatten.py [--repeat N]
+
+Para cada PNG em `logos/` confere que `Gerador.flatten_logo` produz
+exatamente os mesmos bytes da implementação antiga por pixel e compara
+os tempos das duas.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from PIL import Image
+
+import Gerador
+
+
+def flatten_legacy(path):
+    """Implementação original, pixel a pixel em Python."""
+    orig = Image.open(path).convert('RGBA')
+    white_bg = Image.new('RGBA', orig.size, (255,255,255,255))
+    white_bg.paste(orig, mask=orig.split()[3])
+    arr = white_bg.getdata()
+    new_arr = [(r,g,b,255) if a==255 else (255,255,255,255) for (r,g,b,a) in arr]
+    white_bg.putdata(new_arr)
+    return white_bg.convert('RGB')
+
+
+def _best_of(fn, path, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(path)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+    ok = True
+    for path in sorted((ROOT / 'logos').glob('*.png')):
+        path = str(path)
+        same = flatten_legacy(path).tobytes() == Gerador.flatten_logo(path).tobytes()
+        ok &= same
+        t_old = _best_of(flatten_legacy, path, args.repeat)
+        t_new = _best_of(Gerador.flatten_logo, path, args.repeat)
+        size = Image.open(path).size
+        print(f'{Path(path).name:14s} {size[0]}x{size[1]:<5d} '
+              f'antigo {t_old*1000:8.2f} ms  novo {t_new*1000:7.2f} ms  '
+              f'x{t_old/t_new:6.1f}  idêntico={same}')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
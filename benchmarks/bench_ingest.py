@@ -0,0 +1,89 @@
+"""Leitura e validação de planilhas grandes: ingest (streaming) x pandas.read_excel.
+
+Uso:
+    python benchmarks/bench_ingest.py [--rows N] [--bad-every K] [--memory]
+
+Gera um .xlsx e um .csv sintéticos com N linhas (uma data inválida a cada K
+linhas) e mede, para cada um, o tempo (e, com --memory, o pico de memória
+Python, medido numa segunda execução sob tracemalloc) de:
+  * pandas.read_excel / read_csv (carga completa, caminho antigo);
+  * ingest.iter_records (leitura incremental);
+  * ingest.find_invalid (passada de validação vetorizada).
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import ingest
+
+HEADER = ['Cliente', 'Peça', 'Data', 'Hora', 'Código']
+
+
+def synthetic(n, bad_every):
+    base = datetime.datetime(2026, 10, 18, 6, 0, 0)
+    for i in range(n):
+        ts = base + datetime.timedelta(seconds=i)
+        date = '31/02/2026' if bad_every and i % bad_every == 0 else ts.strftime('%d/%m/%Y')
+        yield ['MERCEDES', 'A 960 505 49 55', date, ts.strftime('%H:%M:%S'), f'US{873000 + i}']
+
+
+def write_files(tmp, n, bad_every):
+    import csv
+    from openpyxl import Workbook
+    xlsx, csv_path = os.path.join(tmp, 'lote.xlsx'), os.path.join(tmp, 'lote.csv')
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(HEADER)
+    for row in synthetic(n, bad_every):
+        ws.append(row)
+    wb.save(xlsx)
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        w = csv.writer(f, delimiter=';')
+        w.writerow(HEADER)
+        w.writerows(synthetic(n, bad_every))
+    return xlsx, csv_path
+
+
+def measure(label, fn, memory):
+    t0 = time.perf_counter()
+    result = fn()
+    dt = time.perf_counter() - t0
+    line = f'  {label:28s} {dt:7.2f} s'
+    if memory:
+        # tracemalloc deixa a execução bem mais lenta: mede à parte
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        line += f'  pico {peak/2**20:8.1f} MiB'
+    print(f'{line}  -> {result}')
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--rows', type=int, default=100_000)
+    ap.add_argument('--bad-every', type=int, default=1000)
+    ap.add_argument('--memory', action='store_true')
+    args = ap.parse_args()
+    import pandas as pd
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f'gerando {args.rows} linhas...')
+        xlsx, csv_path = write_files(tmp, args.rows, args.bad_every)
+        for path, read_all in ((xlsx, lambda p: pd.read_excel(p)),
+                               (csv_path, lambda p: pd.read_csv(p, sep=';'))):
+            print(Path(path).name)
+            measure('pandas (carga completa)', lambda: f'{len(read_all(path))} linhas', args.memory)
+            measure('ingest.iter_records', lambda: f'{sum(1 for _ in ingest.iter_records(path))} linhas', args.memory)
+            measure('ingest.find_invalid', lambda: f'{len(ingest.find_invalid(ingest.iter_records(path)))} inválidas', args.memory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Primeiro acesso às logos: imagens originais x pacote compilado (logos.bundle).
+
+Uso:
+    python benchmarks/bench_logo_bundle.py [--repeat N]
+
+Compila um pacote temporário a partir de `clients.json` e mede, com caches
+vazios, o tempo para obter as variantes de preview e de PDF de todos os
+clientes lendo os PNGs originais e lendo o pacote.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import Gerador
+from layout import is_big_logo, place_label
+from logobundle import LogoBundle
+
+
+def load_all(cache, clients):
+    for client, path in clients.items():
+        big = is_big_logo(client)
+        _, _, w, h = place_label({'header': client}).logo_box
+        cache.for_preview(path, Gerador.PREVIEW_LOGO_PX[big])
+        cache.for_pdf(path, w, h)
+
+
+def measure(make_cache, clients, repeat):
+    times = []
+    for _ in range(repeat):
+        cache = make_cache()
+        t0 = time.perf_counter()
+        load_all(cache, clients)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--repeat', type=int, default=5)
+    args = ap.parse_args()
+    os.chdir(ROOT)
+    clients = {c: p for c, p in Gerador.load_clients().items() if p and os.path.exists(p)}
+    with tempfile.TemporaryDirectory() as tmp:
+        bundle_path = os.path.join(tmp, 'logos.bundle')
+        n, variants = Gerador.build_logo_bundle(clients, bundle_path)
+        # Aquecimento: importações adiadas do PIL
+        load_all(Gerador.LogoCache(), clients)
+        original = measure(Gerador.LogoCache, clients, args.repeat)
+        bundles = []
+
+        def from_bundle():
+            bundles.append(LogoBundle(bundle_path))
+            return Gerador.LogoCache(bundle=bundles[-1])
+        bundled = measure(from_bundle, clients, args.repeat)
+        for b in bundles:
+            b.close()
+        print(f'{n} logos, {variants} variantes, pacote de {os.path.getsize(bundle_path)/1024:.1f} KiB')
+        print(f'  imagens originais  {original*1000:8.1f} ms')
+        print(f'  logos.bundle       {bundled*1000:8.1f} ms  ({original/bundled:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Compara logos inline (drawInlineImage) com XObject compartilhado (PdfLogoForms).
+
+Uso:
+    python benchmarks/bench_logo_xobject.py [--pages N]
+
+Desenha 17 logos por página, alternando entre as logos de `logos/`, e mede
+o tempo de escrita e o tamanho do PDF resultante em cada modo.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas as pdf_canvas
+
+import Gerador
+
+LOGOS = sorted(str(p) for p in (ROOT / 'logos').glob('*.png'))
+POR_PAGINA = 17
+
+
+def _posicoes():
+    for idx in range(POR_PAGINA):
+        col, row = idx % 5, idx // 5
+        yield 13*mm + col*40*mm, A4[1] - 30*mm - row*50*mm
+
+
+def render(out, pages, inline):
+    c = pdf_canvas.Canvas(out, pagesize=A4)
+    forms = Gerador.PdfLogoForms(c)
+    size = 12*mm
+    for _ in range(pages):
+        for idx, (x, y) in enumerate(_posicoes()):
+            path = LOGOS[idx % len(LOGOS)]
+            if inline:
+                img = Gerador.LOGO_CACHE.for_pdf(path, size, size)
+                c.drawInlineImage(img, x, y, width=size, height=size)
+            else:
+                forms.draw(path, x, y, size, size)
+        c.showPage()
+    c.save()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--pages', type=int, default=10)
+    args = ap.parse_args()
+    # Aquece o cache de logos para medir apenas a escrita do PDF
+    for path in LOGOS:
+        Gerador.LOGO_CACHE.for_pdf(path, 12*mm, 12*mm)
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, inline in (('inline', True), ('xobject', False)):
+            out = os.path.join(tmp, f'{label}.pdf')
+            t0 = time.perf_counter()
+            render(out, args.pages, inline)
+            dt = time.perf_counter() - t0
+            size_kb = os.path.getsize(out) / 1024
+            print(f'{label:8s} {args.pages} páginas: {dt*1000:8.1f} ms  {size_kb:9.1f} KiB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Vazão (etiquetas/s) da renderização em lote conforme o número de processos.
+
+Uso:
+    python benchmarks/bench_parallel.py [--labels N] [--workers 1 2 4]
+
+Gera linhas sintéticas com os clientes de `clients.json` e mede
+render_batch (1 worker) e render_batch_parallel (demais valores).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import Gerador
+
+
+def synthetic_rows(n, clients):
+    names = list(clients) or ['CLIENTE']
+    for i in range(n):
+        yield {
+            'header': names[i % len(names)],
+            'piece':  'A 960 505 49 55',
+            'date':   '18/10/2026',
+            'time':   '10:00:00',
+            'code':   f'US{873000 + i}',
+        }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--labels', type=int, default=2000)
+    ap.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    ap.add_argument('--pages-per-chunk', type=int, default=20)
+    args = ap.parse_args()
+    os.chdir(ROOT)
+    clients = Gerador.load_clients()
+    with tempfile.TemporaryDirectory() as tmp:
+        for workers in args.workers:
+            out = os.path.join(tmp, f'w{workers}.pdf')
+            rows = synthetic_rows(args.labels, clients)
+            t0 = time.perf_counter()
+            if workers == 1:
+                n = Gerador.render_batch(rows, out, clients)
+            else:
+                n = Gerador.render_batch_parallel(rows, out, clients, workers=workers,
+                                                  pages_per_chunk=args.pages_per_chunk)
+            dt = time.perf_counter() - t0
+            print(f'{workers:2d} workers: {n} etiquetas em {dt:7.2f} s  '
+                  f'{n/dt:8.1f} etiquetas/s  {os.path.getsize(out)/1024:8.1f} KiB')
+
+
+if __name__ == '__main__':
+    main()
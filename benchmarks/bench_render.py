@@ -0,0 +1,115 @@
+"""Tempo de renderização do PDF para 1, 17, 1.000 e 10.000 etiquetas.
+
+Uso:
+    python benchmarks/bench_render.py [--sizes 1 17 1000 10000] [--repeat N]
+                                      [--stages] [--json SAIDA.json]
+                                      [--baseline BASE.json] [--tolerance 0.2]
+
+Usa as logos de `logos/` e os clientes de `clients.json`, alternando os
+clientes entre as etiquetas. Depois de uma renderização de aquecimento
+(importações adiadas), cada repetição começa com os caches de logo e
+de código de barras vazios; o resultado é a mediana das repetições.
+Com --stages, faz uma execução extra por tamanho com a medição de etapas
+(timing.py) ligada e mostra os totais. --json grava os resultados e
+--baseline compara o menor tempo de cada tamanho com um arquivo gravado
+antes, saindo com código 1 se algum ficar mais lento que a base além da
+tolerância.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import Gerador
+from timing import TIMINGS
+
+
+def labels_for(n, clients):
+    names = list(clients) or ['CLIENTE']
+    for i in range(n):
+        name = names[i % len(names)]
+        yield {
+            'header': name,
+            'piece':  'A 960 505 49 55',
+            'date':   '18/10/2026',
+            'time':   '10:00:00',
+            'code':   f'US{873000 + i}',
+            'logo':   clients.get(name),
+        }
+
+
+def render(n, clients, out):
+    Gerador.LOGO_CACHE.clear()
+    Gerador.BARCODE_CACHE.clear()
+    t0 = time.perf_counter()
+    Gerador.render_labels(labels_for(n, clients), out)
+    return time.perf_counter() - t0
+
+
+def stages(n, clients, out):
+    TIMINGS.reset()
+    TIMINGS.enable(os.devnull)
+    try:
+        render(n, clients, out)
+        return TIMINGS.totals()
+    finally:
+        TIMINGS.path = None
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--sizes', type=int, nargs='+', default=[1, 17, 1000, 10000])
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--stages', action='store_true')
+    ap.add_argument('--json', metavar='SAIDA')
+    ap.add_argument('--baseline', metavar='BASE')
+    ap.add_argument('--tolerance', type=float, default=0.2,
+                    help='lentidão relativa aceita em relação à base (0.2 = 20%%)')
+    args = ap.parse_args()
+    os.chdir(ROOT)
+    clients = Gerador.load_clients()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, 'bench.pdf')
+        # Primeira renderização fora da medição: paga as importações adiadas
+        render(1, clients, out)
+        for n in args.sizes:
+            times = [render(n, clients, out) for _ in range(args.repeat)]
+            median = statistics.median(times)
+            results[str(n)] = {'seconds': round(median, 6), 'min': round(min(times), 6),
+                               'bytes': os.path.getsize(out)}
+            print(f'{n:6d} etiquetas: {median:8.3f} s  (min {min(times):.3f})  '
+                  f'{n/median:9.1f} etiquetas/s  {os.path.getsize(out)/1024:9.1f} KiB')
+            if args.stages:
+                totals = stages(n, clients, out)
+                results[str(n)]['stages'] = totals
+                for name, t in totals.items():
+                    print(f'         {name:16s} {t["seconds"]:8.3f} s  {t["calls"]:7d} chamadas')
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            base = json.load(f)
+        failed = False
+        for n, r in results.items():
+            if n not in base:
+                continue
+            # O mínimo oscila menos que a mediana entre execuções
+            ratio = r['min'] / base[n]['min']
+            slow = ratio > 1 + args.tolerance
+            failed |= slow
+            print(f'{n:>6s} etiquetas: {ratio:5.2f}x a base' + ('  <- REGRESSÃO' if slow else ''))
+        return 1 if failed else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
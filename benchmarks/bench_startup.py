@@ -0,0 +1,102 @@
+"""Tempo de inicialização do Gerador.py, com metas verificáveis em CI.
+
+Uso:
+    python benchmarks/bench_startup.py [--repeat N] [--max-import-ms MS] [--max-window-ms MS]
+
+Mede, em processos novos:
+  * o tempo de `import Gerador` via `python -X importtime`, listando os
+    módulos mais caros e falhando se algum módulo pesado (pandas, PIL,
+    ReportLab pdfgen/graphics) for carregado na importação;
+  * o tempo até a primeira janela (import + EtiquetaApp() + update()),
+    quando há display disponível, falhando se o construtor da janela já
+    carregar algum módulo pesado (o primeiro preview fica para o after_idle).
+Sai com código 1 se alguma meta for excedida.
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Módulos que só devem ser carregados no primeiro uso
+HEAVY = ('pandas', 'numpy', 'PIL', 'reportlab.pdfgen', 'reportlab.graphics', 'openpyxl')
+
+WINDOW_SCRIPT = '''
+import sys
+import time
+t0 = time.perf_counter()
+import Gerador
+app = Gerador.EtiquetaApp()
+print(' '.join(m for m in sys.modules if any(m == h or m.startswith(h + '.') for h in %r)))
+app.update()
+print((time.perf_counter() - t0) * 1000)
+app.destroy()
+''' % (HEAVY,)
+
+
+def import_profile():
+    """Retorna (ms totais de `import Gerador`, [(ms cumulativos, módulo)])."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import Gerador'],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    mods = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        mods.append((int(cumulative) / 1000, name.strip()))
+    total = next(ms for ms, name in mods if name == 'Gerador')
+    return total, mods
+
+
+def window_time():
+    """(ms até a primeira janela, módulos pesados carregados pelo construtor), ou None."""
+    proc = subprocess.run([sys.executable, '-c', WINDOW_SCRIPT],
+                          cwd=ROOT, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    loaded, ms = proc.stdout.splitlines()[-2:]
+    return float(ms), sorted(loaded.split())
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--repeat', type=int, default=5)
+    ap.add_argument('--max-import-ms', type=float, default=300)
+    ap.add_argument('--max-window-ms', type=float, default=1500)
+    ap.add_argument('--top', type=int, default=10)
+    args = ap.parse_args()
+    ok = True
+
+    runs = [import_profile() for _ in range(args.repeat)]
+    best, mods = min(runs, key=lambda r: r[0])
+    print(f'import Gerador: {best:.1f} ms (melhor de {args.repeat}, meta {args.max_import_ms:.0f} ms)')
+    for ms, name in sorted(mods, reverse=True)[1:args.top + 1]:
+        print(f'  {ms:8.1f} ms  {name}')
+    loaded = sorted({name for _, name in mods
+                     if any(name == h or name.startswith(h + '.') for h in HEAVY)})
+    if loaded:
+        ok = False
+        print('ERRO: módulos pesados carregados na importação:', ', '.join(loaded))
+    if best > args.max_import_ms:
+        ok = False
+        print('ERRO: importação acima da meta')
+
+    windows = [w for w in (window_time() for _ in range(args.repeat)) if w is not None]
+    if windows:
+        first = min(ms for ms, _ in windows)
+        print(f'primeira janela: {first:.1f} ms (melhor de {len(windows)}, meta {args.max_window_ms:.0f} ms)')
+        if first > args.max_window_ms:
+            ok = False
+            print('ERRO: primeira janela acima da meta')
+        early = sorted({m for _, loaded in windows for m in loaded})
+        if early:
+            ok = False
+            print('ERRO: módulos pesados carregados antes da janela aparecer:', ', '.join(early))
+    else:
+        print('primeira janela: sem display disponível, medição ignorada')
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Tamanho e tempo do PDF: logos raster x vetoriais, Helvetica x fonte TrueType.
+
+Uso:
+    python benchmarks/bench_vector.py [--labels N] [--repeat N] [--logo ARQ.svg]
+                                      [--font NORMAL.ttf NEGRITO.ttf]
+
+Com a mesma logo (um SVG sintético, ou --logo), compara o caminho atual
+(PNG rasterizado a partir do SVG, reduzido a 300 dpi e desenhado como
+imagem) com o caminho vetorial (caminhos do SVG num form), e a Helvetica
+padrão com a fonte TrueType embutida como subconjunto (padrão: Vera, que
+acompanha o ReportLab). Cada medição começa com os caches vazios. Uma
+variante semitransparente do SVG sintético confere que a opacidade chega
+ao PDF: o arquivo é aberto com o MuPDF e qualquer aviso de recurso
+ausente é mostrado. Requer o pacote pymupdf.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import Gerador
+import vectorlogo
+
+SVG = '''<svg xmlns="http://www.w3.org/2000/svg" width="200" height="200" viewBox="0 0 200 200">
+<circle cx="100" cy="100" r="95" fill="#00205b"/>
+<circle cx="100" cy="100" r="80" fill="none" stroke="white" stroke-width="8"/>
+<path d="M100 30 L160 140 L40 140 Z" fill="#ffcc00" stroke="white" stroke-width="4"/>
+<path d="M60 160 C 80 120, 120 120, 140 160" fill="none" stroke="#e4002b" stroke-width="10"/>
+</svg>'''
+# Mesmo desenho com preenchimento e traço translúcidos (ExtGState dentro do form)
+SVG_ALPHA = (SVG.replace('fill="#00205b"', 'fill="#00205b" fill-opacity="0.5"')
+             .replace('stroke="#e4002b"', 'stroke="#e4002b" stroke-opacity="0.4"'))
+
+
+def labels_for(n, logo):
+    for i in range(n):
+        yield {'header': 'DAFF' if i % 2 else 'CLIENTE', 'piece': 'A 960 505 49 55',
+               'date': '18/10/2026', 'time': '10:00:00', 'code': f'US{873000 + i}',
+               'logo': logo}
+
+
+def measure(n, logo, font, out, repeat):
+    if font:
+        os.environ[Gerador.FONT_ENV] = font
+    else:
+        os.environ.pop(Gerador.FONT_ENV, None)
+    times = []
+    for _ in range(repeat):
+        Gerador.LOGO_CACHE.clear()
+        Gerador.BARCODE_CACHE.clear()
+        t0 = time.perf_counter()
+        Gerador.render_labels(labels_for(n, logo), out)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), os.path.getsize(out)
+
+
+def mupdf_warnings(pdf):
+    """Avisos do MuPDF ao desenhar a primeira página (vazio se o PDF está íntegro)."""
+    import pymupdf
+    pymupdf.TOOLS.mupdf_warnings(reset=True)
+    with pymupdf.open(pdf) as doc:
+        doc[0].get_pixmap(dpi=72)
+    return pymupdf.TOOLS.mupdf_warnings(reset=True)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--labels', type=int, default=1000)
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--logo', help='logo SVG/PDF (padrão: SVG sintético)')
+    import reportlab
+    rl_fonts = Path(reportlab.__file__).parent / 'fonts'
+    ap.add_argument('--font', nargs=2, metavar=('NORMAL', 'NEGRITO'),
+                    default=[str(rl_fonts / 'Vera.ttf'), str(rl_fonts / 'VeraBd.ttf')])
+    args = ap.parse_args()
+    font = os.pathsep.join(args.font)
+    with tempfile.TemporaryDirectory() as tmp:
+        vector = args.logo
+        if vector is None:
+            vector = os.path.join(tmp, 'logo.svg')
+            with open(vector, 'w', encoding='utf-8') as f:
+                f.write(SVG)
+        translucent = os.path.join(tmp, 'logo_alpha.svg')
+        with open(translucent, 'w', encoding='utf-8') as f:
+            f.write(SVG_ALPHA)
+        raster = os.path.join(tmp, 'logo.png')
+        vectorlogo.rasterize(vector).save(raster)
+        out = os.path.join(tmp, 'bench.pdf')
+        # Aquecimento: importações adiadas
+        measure(1, raster, None, out, 1)
+        failed = False
+        print(f'{args.labels} etiquetas')
+        for name, logo, f in (('raster + Helvetica', raster, None),
+                              ('vetor + Helvetica', vector, None),
+                              ('raster + TrueType', raster, font),
+                              ('vetor + TrueType', vector, font),
+                              ('vetor translúcido', translucent, None)):
+            dt, size = measure(args.labels, logo, f, out, args.repeat)
+            print(f'  {name:20s} {dt:7.3f} s  {args.labels/dt:8.1f} etiquetas/s  {size/1024:8.1f} KiB')
+            warnings = mupdf_warnings(out)
+            if warnings:
+                print(f'  {"":20s} PDF com erros: {warnings}')
+                failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""Leitura incremental das planilhas de etiquetas (.xlsx, .csv e .xls).
+
+As posições das colunas Cliente/Peça/Data/Hora/Código são resolvidas uma
+única vez a partir do cabeçalho e cada linha vira um dict com os campos da
+etiqueta, com data e hora já normalizadas. `find_invalid` valida data e
+hora de todas as linhas numa passada vetorizada, em blocos, antes de gerar.
+"""
+import codecs
+import csv
+import itertools
+import os
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+# Colunas da planilha -> campos da etiqueta
+COLUMNS = {
+    'Cliente': 'header',
+    'Peça':    'piece',
+    'Data':    'date',
+    'Hora':    'time',
+    'Código':  'code'
+}
+# Mesmos formatos validados por EtiquetaApp.on_generate
+DATE_FORMAT = '%d/%m/%Y'
+TIME_FORMAT = '%H:%M:%S'
+
+
+class SheetError(ValueError):
+    """Planilha sem cabeçalho ou sem alguma das colunas obrigatórias."""
+
+
+@dataclass(frozen=True)
+class RowError:
+    line: int       # linha na planilha (o cabeçalho é a linha 1)
+    column: str
+    value: str
+
+    def __str__(self):
+        return f'linha {self.line}: {self.column} inválida ({self.value!r})'
+
+
+def _norm_header(h):
+    # 'Peça', 'PECA' e ' peca ' resolvem para a mesma coluna
+    h = unicodedata.normalize('NFKD', str(h or '')).strip().casefold()
+    return ''.join(ch for ch in h if not unicodedata.combining(ch))
+
+
+def column_index(header):
+    """Posição de cada campo da etiqueta no cabeçalho dado."""
+    positions = {_norm_header(h): i for i, h in reversed(list(enumerate(header)))}
+    index, missing = {}, []
+    for col, field in COLUMNS.items():
+        pos = positions.get(_norm_header(col))
+        if pos is None:
+            missing.append(col)
+        else:
+            index[field] = pos
+    if missing:
+        raise SheetError('Colunas ausentes na planilha: ' + ', '.join(missing))
+    return index
+
+
+def csv_encoding(path, chunk=1 << 20):
+    """'utf-8-sig' se o CSV inteiro é UTF-8 válido; senão 'cp1252'.
+
+    O Excel em português no Windows exporta "CSV separado por ponto e
+    vírgula" em cp1252. O arquivo é conferido por inteiro, em blocos, antes
+    da leitura: um erro só na linha 50.000 viria depois de etiquetas já
+    geradas.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    with open(path, 'rb') as f:
+        try:
+            for block in iter(lambda: f.read(chunk), b''):
+                decoder.decode(block)
+            decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            return 'cp1252'
+    return 'utf-8-sig'
+
+
+def read_rows(path):
+    """Gera as linhas da planilha como tuplas de valores, cabeçalho incluído."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        encoding = csv_encoding(path)
+        try:
+            with open(path, newline='', encoding=encoding) as f:
+                sample = f.read(4096)
+                f.seek(0)
+                try:
+                    dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+                except csv.Error:
+                    dialect = csv.excel
+                yield from csv.reader(f, dialect)
+        except UnicodeDecodeError as e:
+            raise SheetError(f'{os.path.basename(path)}: codificação não reconhecida '
+                             f'(salve o CSV como UTF-8): {e}')
+    elif ext == '.xlsx':
+        # Modo somente-leitura: a memória não cresce com o número de linhas
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            yield from wb.active.iter_rows(values_only=True)
+        finally:
+            wb.close()
+    elif ext == '.xls':
+        # .xls antigo: sem leitura incremental, carrega via pandas
+        import pandas as pd
+        df = pd.read_excel(path, dtype=object)
+        yield tuple(df.columns)
+        for values in df.itertuples(index=False):
+            yield tuple(None if v is pd.NaT or v != v else v for v in values)
+    else:
+        raise SheetError(f'Formato de planilha não suportado: {ext or path}')
+
+
+def cell_text(field, v):
+    """Converte o valor de uma célula no texto do campo da etiqueta."""
+    if v is None:
+        return ''
+    if field == 'date' and hasattr(v, 'strftime'):
+        return v.strftime(DATE_FORMAT)
+    if field == 'time':
+        if hasattr(v, 'strftime'):
+            return v.strftime(TIME_FORMAT)
+        if isinstance(v, timedelta):
+            return (datetime.min + v).strftime(TIME_FORMAT)
+    if isinstance(v, float) and v.is_integer():
+        # Códigos numéricos lidos como float (873001.0)
+        return str(int(v))
+    return str(v).strip()
+
+
+def iter_records(path):
+    """Gera (linha, campos) para cada linha não vazia da planilha.
+
+    `campos` é um dict com as chaves header/piece/date/time/code.
+    """
+    rows = read_rows(path)
+    header = next(rows, None)
+    if header is None:
+        return
+    index = list(column_index(header).items())
+    for line, values in enumerate(rows, start=2):
+        if all(v is None or v == '' for v in values):
+            continue
+        n = len(values)
+        yield line, {field: cell_text(field, values[pos] if pos < n else None)
+                     for field, pos in index}
+
+
+def find_invalid(records, chunk_size=10000):
+    """Valida data e hora de todas as linhas e devolve a lista de RowError.
+
+    `records` são os pares (linha, campos) de iter_records. A validação é
+    feita com pandas.to_datetime sobre blocos de `chunk_size` linhas, com as
+    mesmas regras de strptime usadas na interface.
+    """
+    import numpy as np
+    import pandas as pd
+    errors = []
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return errors
+        lines = [line for line, _ in chunk]
+        found = []
+        for field, fmt, col in (('date', DATE_FORMAT, 'Data'), ('time', TIME_FORMAT, 'Hora')):
+            values = pd.Series([rec[field] for _, rec in chunk], dtype=object)
+            bad = pd.to_datetime(values, format=fmt, errors='coerce').isna()
+            if field == 'time':
+                # strptime do datetime recusa segundos 60/61; o pandas aceita
+                bad |= values.str.contains(r':6[01]$', na=False)
+            found.extend(RowError(lines[i], col, values[i])
+                         for i in np.flatnonzero(bad.to_numpy()))
+        errors.extend(sorted(found, key=lambda e: e.line))
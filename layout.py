@@ -0,0 +1,255 @@
+"""Geometria das etiquetas na folha, sem dependência de Tk nem do backend.
+
+A posição de cada slot da folha e as métricas dos textos fixos (marca e
+submarca) são calculadas uma única vez por modelo de folha; `place_labels`
+devolve registros prontos para qualquer backend desenhar (PDF, preview,
+impressora).
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+
+# Tamanho da etiqueta (horizontal), em pontos
+LABEL_W, LABEL_H = 74*mm, 34*mm
+# Código de barras: largura do módulo, altura das barras e largura máxima
+BARCODE_BAR_WIDTH  = 0.6*mm
+BARCODE_HEIGHT     = 10*mm
+BARCODE_MAX_WIDTH  = 47*mm
+
+
+@dataclass(frozen=True)
+class Slot:
+    """Origem da etiqueta na página e rotação (graus) aplicada após transladar."""
+    x: float
+    y: float
+    rotation: int = 0
+
+
+@dataclass(frozen=True)
+class Block:
+    """Grade de etiquetas numa mesma orientação, dentro de um modelo de folha.
+
+    `rotation` 90 deixa a etiqueta em pé; `align` 'left' começa na margem
+    esquerda e 'center' centraliza a grade na página.
+    """
+    cols: int
+    rows: int
+    rotation: int = 0
+    align: str = 'left'
+
+    @property
+    def size(self):
+        return self.cols*self.rows
+
+
+@dataclass(frozen=True)
+class SheetTemplate:
+    """Modelo de folha: tamanho da etiqueta, margens, espaçamentos e blocos de slots.
+
+    Os blocos são empilhados de cima para baixo, separados por `gv`. O padrão
+    é a folha A4 original: 15 etiquetas em pé (5x3) e 2 deitadas abaixo.
+    """
+    name: str = 'A4-17'
+    page: tuple = A4
+    label_w: float = LABEL_W
+    label_h: float = LABEL_H
+    ml: float = 13*mm
+    mt: float = 12*mm
+    gh: float = 3*mm
+    gv: float = 3*mm
+    blocks: tuple = (Block(5, 3, 90), Block(2, 1, 0, 'center'))
+
+    @property
+    def size(self):
+        return sum(b.size for b in self.blocks)
+
+    @property
+    def scale(self):
+        """Escala do desenho da etiqueta (feito para 74x34 mm) para o tamanho do modelo."""
+        return self.label_w/LABEL_W, self.label_h/LABEL_H
+
+    def slots(self):
+        return _slots(self)
+
+
+@lru_cache(maxsize=None)
+def _slots(t):
+    page_w, page_h = t.page
+    top = page_h - t.mt
+    slots = []
+    for b in t.blocks:
+        slot_w, slot_h = (t.label_h, t.label_w) if b.rotation == 90 else (t.label_w, t.label_h)
+        row_w = b.cols*slot_w + (b.cols-1)*t.gh
+        start_x = (page_w-row_w)/2 if b.align == 'center' else t.ml
+        for row in range(b.rows):
+            y0 = top - (row+1)*slot_h - row*t.gv
+            for col in range(b.cols):
+                x0 = start_x + col*(slot_w+t.gh)
+                if b.rotation == 90:
+                    # Rotação de 90° em torno do centro do slot: a origem da
+                    # etiqueta fica no canto inferior direito do slot
+                    slots.append(Slot(x0+slot_w, y0, 90))
+                else:
+                    slots.append(Slot(x0, y0))
+        top -= b.rows*(slot_h+t.gv)
+    return tuple(slots)
+
+
+A4_SHEET = SheetTemplate()
+
+
+def template_from_dict(name, d):
+    """Modelo de folha a partir da forma declarativa (medidas em mm), como em templates.json.
+
+    Exemplo::
+
+        {"page": "A4", "label": [74, 34], "margins": [13, 12], "gaps": [3, 3],
+         "blocks": [{"cols": 5, "rows": 3, "rotation": 90},
+                    {"cols": 2, "rows": 1, "align": "center"}]}
+    """
+    try:
+        page = d.get('page', 'A4')
+        if isinstance(page, str):
+            from reportlab.lib import pagesizes
+            page = getattr(pagesizes, page.upper())
+        else:
+            page = (page[0]*mm, page[1]*mm)
+        label_w, label_h = d.get('label', (74, 34))
+        ml, mt = d.get('margins', (13, 12))
+        gh, gv = d.get('gaps', (3, 3))
+        blocks = tuple(Block(b['cols'], b['rows'], b.get('rotation', 0), b.get('align', 'left'))
+                       for b in d['blocks'])
+        template = SheetTemplate(name, tuple(page), label_w*mm, label_h*mm,
+                                 ml*mm, mt*mm, gh*mm, gv*mm, blocks)
+    except KeyError as e:
+        raise ValueError(f'Modelo de folha {name}: falta o campo {e}')
+    except (AttributeError, IndexError, TypeError, ValueError) as e:
+        raise ValueError(f'Modelo de folha {name} inválido: {e}')
+    for b in blocks:
+        if b.rotation not in (0, 90) or b.align not in ('left', 'center'):
+            raise ValueError(f'Bloco inválido no modelo {name}: {b}')
+    return template
+
+
+def load_templates(path='templates.json'):
+    """Modelos declarados no arquivo JSON {nome: modelo}; sempre inclui o A4-17 padrão.
+
+    Arquivo ou modelo mal formado levanta ValueError com o nome do modelo.
+    """
+    import json
+    templates = {A4_SHEET.name: A4_SHEET}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except OSError:
+        return templates
+    except ValueError as e:
+        raise ValueError(f'{path} ilegível: {e}')
+    if not isinstance(data, dict) or not all(isinstance(d, dict) for d in data.values()):
+        raise ValueError(f'{path}: esperado um objeto {{nome: modelo}}')
+    for name, d in data.items():
+        templates[name] = template_from_dict(name, d)
+    return templates
+
+
+def _fit(avail, size, gap):
+    return max(0, int((avail + gap) // (size + gap)))
+
+
+def pack_template(label_w, label_h, page=A4, ml=13*mm, mt=12*mm, gh=3*mm, gv=3*mm):
+    """Modelo que coloca o maior número de etiquetas label_w x label_h (pontos) na página.
+
+    Testa grades só deitadas, só em pé e combinações de linhas em pé seguidas
+    de linhas deitadas (ou o contrário) no espaço que sobra, com as mesmas
+    margens dos dois lados.
+    """
+    page_w, page_h = page
+    avail_w, avail_h = page_w - 2*ml, page_h - 2*mt
+    best = None
+    for first in (90, 0):
+        second = 0 if first == 90 else 90
+        w1, h1 = (label_h, label_w) if first == 90 else (label_w, label_h)
+        w2, h2 = (label_h, label_w) if second == 90 else (label_w, label_h)
+        cols1, cols2 = _fit(avail_w, w1, gh), _fit(avail_w, w2, gh)
+        for rows1 in range(_fit(avail_h, h1, gv) + 1):
+            used = rows1*(h1+gv)
+            rows2 = _fit(avail_h - used, h2, gv)
+            blocks = []
+            if cols1 and rows1:
+                blocks.append(Block(cols1, rows1, first))
+            if cols2 and rows2:
+                blocks.append(Block(cols2, rows2, second, 'center' if blocks else 'left'))
+            count = sum(b.size for b in blocks)
+            if blocks and (best is None or count > best[0]):
+                best = (count, tuple(blocks))
+    if best is None:
+        raise ValueError('A etiqueta não cabe na página')
+    count, blocks = best
+    name = f'auto-{label_w/mm:g}x{label_h/mm:g}-{count}'
+    return SheetTemplate(name, tuple(page), label_w, label_h, ml, mt, gh, gv, blocks)
+
+
+@dataclass(frozen=True)
+class BrandBlock:
+    """Posição dos textos fixos de marca, centralizados à direita da etiqueta,
+    e as fontes (normal e negrito) de todos os textos da etiqueta."""
+    brand_text: str
+    subbrand_text: str
+    center_x: float
+    brand_y: float
+    subbrand_y: float
+    regular: str = 'Helvetica'
+    bold: str = 'Helvetica-Bold'
+
+
+@lru_cache(maxsize=32)
+def brand_block(brand_text, subbrand_text, regular='Helvetica', bold='Helvetica-Bold'):
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+    brand_w = stringWidth(brand_text, bold, 9)
+    subbrand_w = stringWidth(subbrand_text, regular, 7)
+    max_w = max(brand_w, subbrand_w)
+    brand_y = LABEL_H-7*mm
+    return BrandBlock(brand_text, subbrand_text,
+                      LABEL_W-5*mm - max_w/2, brand_y, brand_y - 9, regular, bold)
+
+
+def is_big_logo(hdr):
+    """DAF e IVECO usam logo maior e não imprimem o nome do cliente."""
+    hdr = hdr.strip().upper()
+    return hdr.startswith('DAF') or hdr.startswith('IVECO')
+
+
+@dataclass(frozen=True)
+class PlacedLabel:
+    """Etiqueta posicionada: slot na página e coordenadas locais dos elementos."""
+    slot: Slot
+    label: dict
+    big: bool
+    logo_box: tuple     # (x, y, largura, altura)
+    header_pos: tuple   # (x, y), ou None quando só a logo é impressa
+    piece_x: float
+
+
+@lru_cache(maxsize=4)
+def _label_geometry(big):
+    logo_size = 12*mm if big else 6*mm
+    hdr_y = LABEL_H-5*mm
+    logo_box = (2*mm, hdr_y - logo_size/2, logo_size, logo_size)
+    if big:
+        return logo_box, None, 2*mm
+    hdr_x = 2*mm + logo_size + 1*mm
+    return logo_box, (hdr_x, hdr_y), hdr_x
+
+
+def place_label(label, slot=Slot(0, 0)):
+    """Posiciona uma etiqueta avulsa (p.ex. numa impressora de etiquetas)."""
+    big = is_big_logo(label['header'])
+    logo_box, header_pos, piece_x = _label_geometry(big)
+    return PlacedLabel(slot, label, big, logo_box, header_pos, piece_x)
+
+
+def place_labels(labels, template=A4_SHEET):
+    """Associa cada etiqueta (dict de campos) a um slot da folha, em ordem."""
+    return [place_label(label, slot) for slot, label in zip(template.slots(), labels)]
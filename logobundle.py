@@ -0,0 +1,120 @@
+"""Pacote de logos já achatadas e redimensionadas, compilado do clients.json.
+
+Para cada logo o pacote guarda as variantes nos tamanhos exatos usados pelo
+preview e pelo PDF, em RGB cru, mais um índice JSON com a origem de cada
+variante e o mtime/tamanho do arquivo original. O arquivo é aberto com
+mmap: só o índice é lido na abertura e cada variante é copiada do mapa
+quando pedida. Variantes ausentes, ou de logos alteradas depois da
+compilação, devolvem None e quem chamou volta às imagens originais.
+
+Formato: MAGIC, tamanho do índice (uint32 little-endian), índice JSON e os
+dados das imagens em sequência.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+
+MAGIC = b'ETQLOGO1'
+_HEADER = struct.Struct('<8sI')
+# Pacote padrão, ao lado do clients.json
+BUNDLE_PATH = 'logos.bundle'
+
+
+def preview_key(height_px):
+    return f'preview-{height_px}'
+
+
+def pdf_key(px_w, px_h, dpi):
+    return f'pdf-{px_w}x{px_h}-{dpi}'
+
+
+def source_stamp(path):
+    """Identifica a versão do arquivo original: [mtime em ns, tamanho]."""
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def write_bundle(out, images, clients_map):
+    """Grava o pacote; `images` é {caminho: {variante: imagem PIL}}.
+
+    Retorna o total de variantes gravadas.
+    """
+    index = {'clients': clients_map, 'logos': {}}
+    chunks, offset = [], 0
+    for path, variants in images.items():
+        entry = {'source': source_stamp(path), 'images': {}}
+        for key, img in variants.items():
+            data = img.convert('RGB').tobytes()
+            entry['images'][key] = [offset, img.width, img.height]
+            chunks.append(data)
+            offset += len(data)
+        index['logos'][path] = entry
+    raw_index = json.dumps(index, ensure_ascii=False).encode('utf-8')
+    tmp = f'{out}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, len(raw_index)))
+        f.write(raw_index)
+        for data in chunks:
+            f.write(data)
+    os.replace(tmp, out)
+    return sum(len(v) for v in images.values())
+
+
+class LogoBundle:
+    """Leitura do pacote de logos, aberto só na primeira consulta."""
+
+    def __init__(self, path=BUNDLE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self._map = None
+        self._index = None
+        self._data = 0
+
+    def _open(self):
+        self._index = {}
+        try:
+            f = open(self.path, 'rb')
+        except OSError:
+            return
+        try:
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, size = _HEADER.unpack_from(m)
+            if magic != MAGIC:
+                raise ValueError('assinatura inválida')
+            self._index = json.loads(m[_HEADER.size:_HEADER.size + size])['logos']
+        except (OSError, ValueError, struct.error) as e:
+            print('Pacote de logos ignorado:', e)
+            f.close()
+            return
+        self._file, self._map = f, m
+        self._data = _HEADER.size + size
+
+    def image(self, path, key):
+        """Variante `key` da logo como imagem RGB, ou None se ausente ou desatualizada."""
+        with self._lock:
+            if self._index is None:
+                self._open()
+            entry = self._index.get(path)
+            if entry is None or key not in entry['images']:
+                return None
+            try:
+                if source_stamp(path) != entry['source']:
+                    return None
+            except OSError:
+                return None
+            offset, w, h = entry['images'][key]
+            start = self._data + offset
+            data = self._map[start:start + w*h*3]
+        from PIL import Image
+        return Image.frombuffer('RGB', (w, h), data, 'raw', 'RGB', 0, 1)
+
+    def close(self):
+        """Libera o arquivo (p.ex. antes de recompilar); a próxima consulta reabre."""
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._file.close()
+            self._file = self._map = self._index = None
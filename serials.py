@@ -0,0 +1,113 @@
+"""Códigos sequenciais: padrões como `US873{seq:03d}` e contadores persistentes.
+
+Cada padrão tem, num arquivo JSON local, o próximo número ainda não usado.
+A faixa de uma geração é reservada e gravada antes de renderizar, então
+reiniciar o programa (ou cancelar uma geração) nunca reaproveita um número:
+no pior caso alguns ficam sem uso. A reserva trava um arquivo `.lock` ao
+lado dos contadores, então vários processos no mesmo computador (duas
+janelas, ou a interface e o `--serve`) também nunca pegam a mesma faixa.
+"""
+import contextlib
+import json
+import os
+import string
+import threading
+import time
+
+
+class PatternError(ValueError):
+    """Padrão de código sequencial inválido."""
+
+
+def is_pattern(code):
+    return '{seq' in code
+
+
+def check_pattern(pattern):
+    """Confere que o padrão tem um único campo {seq} com formato numérico válido."""
+    try:
+        fields = [f for _, f, _, _ in string.Formatter().parse(pattern) if f is not None]
+        if fields != ['seq']:
+            raise ValueError
+        pattern.format(seq=0)
+    except (ValueError, IndexError, KeyError):
+        raise PatternError(f'Padrão de código inválido: {pattern!r} '
+                           '(use um único campo {seq}, p.ex. US873{seq:03d})')
+
+
+def codes(pattern, first, count):
+    """Os `count` códigos do padrão a partir do número `first`."""
+    return [pattern.format(seq=n) for n in range(first, first + count)]
+
+
+def default_counter_path():
+    base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(base, 'etiquetas', 'contadores.json')
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Trava exclusiva entre processos sobre o arquivo `path` (criado se preciso)."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a+b') as f:
+        if os.name == 'nt':
+            import msvcrt
+            # LK_LOCK desiste depois de ~10 s; insiste até conseguir
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class CounterStore:
+    """Próximo número livre de cada padrão, gravado em `path` a cada reserva."""
+
+    def __init__(self, path=None):
+        self.path = path or default_counter_path()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            # Zerar os contadores reaproveitaria números já impressos
+            raise PatternError(f'Arquivo de contadores ilegível: {self.path}')
+
+    def next(self, pattern, start=1):
+        """Primeiro número que a próxima reserva do padrão usaria."""
+        with self._lock:
+            return max(start, self._load().get(pattern, start))
+
+    def reserve(self, pattern, count, start=1):
+        """Reserva `count` números a partir de max(start, próximo livre) e devolve o primeiro."""
+        check_pattern(pattern)
+        # Trava das threads deste processo e, pelo arquivo, dos outros processos
+        with self._lock, file_lock(self.path + '.lock'):
+            data = self._load()
+            first = max(start, data.get(pattern, start))
+            data[pattern] = first + count
+            tmp = f'{self.path}.{os.getpid()}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+            return first
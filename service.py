@@ -0,0 +1,302 @@
+"""Modo serviço: processo asyncio de longa duração que gera os PDFs das estações.
+
+Cada estação envia o trabalho por HTTP (TCP local ou socket Unix) e recebe
+os bytes do PDF, em vez de renderizar por conta própria. Os trabalhos rodam
+num pool limitado de processos que ficam com fontes, logos e códigos de
+barras carregados entre um trabalho e outro; PDFs repetidos saem de um
+cache em memória, indexado pelo mesmo digest do cache em disco.
+
+    POST /labels  {"groups": [{"header": "DAFF", "piece": "...", "date": "18/10/2026",
+                               "time": "10:00:00", "code": "US873001", "count": 17}],
+                   "template": "A4-17"}                        -> application/pdf
+    GET  /health                                               -> estado em JSON
+
+O código de um grupo pode ser um padrão sequencial (`US873{seq:03d}`, com
+"start" opcional no trabalho); os números saem dos contadores do serviço e
+as faixas usadas voltam no cabeçalho X-Sequence-Ranges, em JSON.
+
+A logo de cada grupo vem do clients.json do serviço, pelo campo header,
+como na interface. Uma requisição por conexão (Connection: close).
+"""
+import asyncio
+import http.client
+import json
+import os
+import socket
+import sys
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import Gerador
+from ingest import DATE_FORMAT, TIME_FORMAT
+from layout import A4_SHEET, load_templates
+from serials import CounterStore, PatternError, check_pattern, is_pattern
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+# Maior corpo de requisição aceito
+MAX_BODY = 1 << 20
+# Maior trabalho aceito, em etiquetas
+MAX_JOB_LABELS = 100_000
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class JobError(ValueError):
+    """Trabalho mal formado ou inválido (resposta 400)."""
+
+
+class ServiceError(RuntimeError):
+    """O serviço respondeu com erro (`status` é o código HTTP, ou None)."""
+
+    def __init__(self, msg, status=None):
+        super().__init__(msg)
+        self.status = status
+
+
+def parse_job(data, clients_map, templates, max_labels=MAX_JOB_LABELS, counters=None):
+    """Valida o JSON de um trabalho e devolve (grupos, início, modelo, marca, submarca).
+
+    Os grupos são pares (etiqueta, quantidade), como em Gerador.expand_groups.
+    Códigos com padrão {seq} (serials.py) só são conferidos aqui; os números
+    saem de `counters` em Gerador.sequence_labels, a partir do início
+    data["start"], então estações diferentes nunca repetem números.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('groups'), list) or not data['groups']:
+        raise JobError('Trabalho sem grupos')
+    groups = []
+    for i, g in enumerate(data['groups'], start=1):
+        try:
+            label = {nm: str(g[nm]) for nm in Gerador.LABEL_FIELDS}
+            count = int(g.get('count', 1))
+        except (KeyError, TypeError, ValueError):
+            raise JobError(f'Grupo {i}: informe {", ".join(Gerador.LABEL_FIELDS)} e count')
+        try:
+            datetime.strptime(label['date'], DATE_FORMAT)
+            datetime.strptime(label['time'], TIME_FORMAT)
+        except ValueError:
+            raise JobError(f'Grupo {i}: Data/Hora inválidas')
+        if count < 0:
+            raise JobError(f'Grupo {i}: quantidade inválida')
+        if is_pattern(label['code']):
+            if counters is None:
+                raise JobError('Códigos sequenciais não habilitados neste serviço')
+            try:
+                check_pattern(label['code'])
+            except PatternError as e:
+                raise JobError(f'Grupo {i}: {e}')
+        label['logo'] = clients_map.get(label['header'])
+        groups.append((label, count))
+    total = sum(count for _, count in groups)
+    if not 1 <= total <= max_labels:
+        raise JobError(f'O total de etiquetas deve ficar entre 1 e {max_labels}')
+    name = data.get('template', A4_SHEET.name)
+    if name not in templates:
+        raise JobError(f'Modelo de folha desconhecido: {name}')
+    try:
+        start = int(data.get('start', 1))
+    except (TypeError, ValueError):
+        raise JobError('Início da sequência inválido')
+    return (groups, start, templates[name],
+            str(data.get('brand', Gerador.BRAND_TEXT)),
+            str(data.get('subbrand', Gerador.SUBBRAND_TEXT)))
+
+
+def _warm_worker(clients_map):
+    """Inicializa um processo do pool: uma etiqueta de cada cliente carrega
+    ReportLab, fontes e logos antes do primeiro trabalho."""
+    labels = [{'header': client, 'piece': '', 'date': '', 'time': '', 'code': '0',
+               'logo': path} for client, path in clients_map.items()]
+    if labels:
+        Gerador.render_pdf_bytes(labels)
+
+
+class LabelService:
+    """Fila de trabalhos sobre um pool de `workers` processos.
+
+    Com mais de `max_pending` trabalhos em andamento, novos pedidos recebem
+    503 em vez de esperar indefinidamente.
+    """
+
+    def __init__(self, clients_map, templates, workers=1, max_pending=None, cache_size=32):
+        self.clients_map = clients_map
+        self.templates = templates
+        self.workers = workers
+        self.max_pending = max_pending or 4*workers
+        self.pool = ProcessPoolExecutor(workers, initializer=_warm_worker,
+                                        initargs=(clients_map,))
+        self.pdfs = Gerador.LRUCache(cache_size)
+        # Contadores dos códigos sequenciais, compartilhados por todas as estações
+        self.counters = CounterStore()
+        self.pending = 0
+        self.stats = {'jobs': 0, 'cached': 0, 'errors': 0}
+
+    async def render(self, data):
+        """PDF de um trabalho (dict já decodificado do JSON) e as faixas numeradas."""
+        groups, start, template, brand, subbrand = parse_job(
+            data, self.clients_map, self.templates, counters=self.counters)
+        loop = asyncio.get_running_loop()
+        # A reserva grava o arquivo de contadores (com fsync): fora do laço de eventos
+        labels, ranges = await loop.run_in_executor(None, Gerador.sequence_labels,
+                                                    groups, self.counters, start)
+        digest = await loop.run_in_executor(None, Gerador.labels_digest,
+                                            labels, brand, subbrand, template)
+        pdf = self.pdfs.find(digest)
+        if pdf is not None:
+            self.stats['cached'] += 1
+            return pdf, ranges
+        pdf = await loop.run_in_executor(self.pool, Gerador.render_pdf_bytes,
+                                         labels, brand, subbrand, template)
+        self.pdfs.put(digest, pdf)
+        return pdf, ranges
+
+    async def _route(self, method, path, body):
+        """(status, tipo, corpo, cabeçalhos extras) da resposta."""
+        if path == '/health':
+            state = dict(self.stats, workers=self.workers, pending=self.pending,
+                         cached_pdfs=len(self.pdfs))
+            return 200, 'application/json', json.dumps(state).encode('utf-8'), {}
+        if path != '/labels':
+            return 404, 'application/json', b'{"error": "not found"}', {}
+        if method != 'POST':
+            return 405, 'application/json', b'{"error": "use POST"}', {}
+        if self.pending >= self.max_pending:
+            return 503, 'application/json', b'{"error": "fila cheia"}', {}
+        self.pending += 1
+        try:
+            pdf, ranges = await self.render(json.loads(body))
+        except (JobError, ValueError) as e:
+            self.stats['errors'] += 1
+            return 400, 'application/json', json.dumps({'error': str(e)}).encode('utf-8'), {}
+        finally:
+            self.pending -= 1
+        self.stats['jobs'] += 1
+        return 200, 'application/pdf', pdf, {'X-Sequence-Ranges': json.dumps(ranges)}
+
+    async def handle(self, reader, writer):
+        """Atende uma requisição HTTP/1.1 na conexão."""
+        try:
+            try:
+                method, target, _ = (await reader.readline()).decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length < 0:
+                    raise ValueError(length)
+            except ValueError:
+                status, ctype, payload = 400, 'application/json', b'{"error": "bad request"}'
+                extra = {}
+            else:
+                if length > MAX_BODY:
+                    status, ctype, payload = 413, 'application/json', b'{"error": "too large"}'
+                    extra = {}
+                else:
+                    body = await reader.readexactly(length)
+                    path = urllib.parse.urlsplit(target).path
+                    try:
+                        status, ctype, payload, extra = await self._route(method, path, body)
+                    except Exception as e:
+                        print('Erro no trabalho:', e)
+                        status, ctype, extra = 500, 'application/json', {}
+                        payload = json.dumps({'error': str(e)}).encode('utf-8')
+            extra_lines = ''.join(f'{k}: {v}\r\n' for k, v in extra.items())
+            writer.write(f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+                         f'Content-Type: {ctype}\r\n'
+                         f'Content-Length: {len(payload)}\r\n{extra_lines}'
+                         'Connection: close\r\n\r\n'.encode('latin-1') + payload)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle, unix_path)
+            where = f'unix:{unix_path}'
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            where = f'http://{host}:{port}'
+        print(f'Serviço de etiquetas em {where} ({self.workers} processos)')
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def run(args):
+    """Ponto de entrada do `Gerador.py --serve`."""
+    workers = args.workers or os.cpu_count() or 1
+    try:
+        templates = load_templates(args.templates)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    svc = LabelService(Gerador.load_clients(args.clients), templates, workers=workers)
+    try:
+        asyncio.run(svc.serve(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        svc.close()
+    return 0
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+def _connection(address, timeout):
+    if address.startswith('unix:'):
+        return _UnixConnection(address[len('unix:'):], timeout)
+    url = urllib.parse.urlsplit(address if '://' in address else f'http://{address}')
+    return http.client.HTTPConnection(url.hostname, url.port or DEFAULT_PORT, timeout=timeout)
+
+
+def request_pdf(address, groups, brand_text=Gerador.BRAND_TEXT,
+                subbrand_text=Gerador.SUBBRAND_TEXT, template=A4_SHEET.name, start=1, timeout=300):
+    """Envia os grupos [(etiqueta, quantidade)] ao serviço em `address`.
+
+    Códigos com padrão {seq} vão como padrão e são numerados pelos contadores
+    do serviço, a partir de `start`. Devolve (bytes do PDF, faixas numeradas
+    [(primeiro código, último código)]). Falhas de conexão saem como
+    OSError; respostas de erro, como ServiceError.
+    """
+    body = json.dumps({'groups': [dict({nm: label[nm] for nm in Gerador.LABEL_FIELDS}, count=count)
+                                  for label, count in groups],
+                       'start': start, 'template': template,
+                       'brand': brand_text, 'subbrand': subbrand_text}).encode('utf-8')
+    conn = _connection(address, timeout)
+    try:
+        conn.request('POST', '/labels', body, {'Content-Type': 'application/json'})
+        resp = conn.getresponse()
+        data = resp.read()
+    except http.client.HTTPException as e:
+        raise ServiceError(f'Resposta inválida do serviço: {e}')
+    finally:
+        conn.close()
+    if resp.status != 200:
+        try:
+            msg = json.loads(data)['error']
+        except (ValueError, KeyError, TypeError):
+            msg = data[:200].decode('utf-8', 'replace')
+        raise ServiceError(f'Serviço respondeu {resp.status}: {msg}', resp.status)
+    try:
+        ranges = [tuple(r) for r in json.loads(resp.getheader('X-Sequence-Ranges') or '[]')]
+    except (ValueError, TypeError):
+        raise ServiceError('Resposta inválida do serviço: faixas da sequência')
+    return data, ranges
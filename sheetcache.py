@@ -0,0 +1,113 @@
+"""Cache em disco dos PDFs já renderizados, indexado pelo hash do conteúdo.
+
+O digest cobre tudo o que muda o resultado: os campos de cada etiqueta na
+ordem dos slots, o conteúdo (não só o caminho) das logos, os textos de
+marca e as constantes de layout. Gerar de novo com as mesmas entradas só
+copia o PDF do cache. O diretório tem tamanho máximo; os arquivos usados há
+mais tempo são removidos primeiro.
+"""
+import dataclasses
+import glob
+import hashlib
+import json
+import os
+import shutil
+from functools import lru_cache
+
+# Mudar quando o desenho da etiqueta mudar, para invalidar o cache antigo
+RENDER_VERSION = 1
+
+
+@lru_cache(maxsize=256)
+def _file_digest(path, mtime, size):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_digest(path):
+    """sha256 do arquivo, recalculado só quando mtime ou tamanho mudam."""
+    if not path or not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    return _file_digest(path, st.st_mtime, st.st_size)
+
+
+def render_digest(payload, logo_paths, brand_text, subbrand_text, template, constants=()):
+    """Digest das entradas efetivas de uma renderização.
+
+    `payload` é qualquer estrutura serializável em JSON que descreva as
+    etiquetas (p.ex. a lista de dicts por slot); `logo_paths` são as logos
+    usadas, cujo conteúdo entra no hash.
+    """
+    logos = sorted((p, file_digest(p)) for p in set(logo_paths) if p)
+    key = [RENDER_VERSION, payload, logos, brand_text, subbrand_text,
+           dataclasses.asdict(template), list(constants)]
+    data = json.dumps(key, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def default_cache_dir():
+    base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'etiquetas', 'pdf')
+
+
+class SheetCache:
+    """Diretório de PDFs renderizados, com limite de tamanho total."""
+
+    def __init__(self, directory=None, max_bytes=200 * 2**20):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest + '.pdf')
+
+    def fetch(self, digest, out):
+        """Copia o PDF em cache para `out`; False se não houver."""
+        path = self._path(digest)
+        try:
+            # Marca o uso para a remoção por antiguidade
+            os.utime(path)
+            shutil.copyfile(path, out)
+        except OSError:
+            return False
+        return True
+
+    def put(self, digest, src):
+        """Guarda uma cópia de `src` e remove os arquivos mais antigos se passar do limite.
+
+        Falhas de disco só são registradas: o cache nunca interrompe a geração.
+        """
+        path = self._path(digest)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            shutil.copyfile(src, tmp)
+            os.replace(tmp, path)
+            self._evict()
+        except OSError as e:
+            print('Erro ao gravar cache de PDF:', e)
+
+    def _evict(self):
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, '*.pdf')):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        for path in glob.glob(os.path.join(self.directory, '*.pdf')):
+            os.remove(path)
@@ -0,0 +1,124 @@
+"""Leitura das planilhas: cabeçalho, conversão das células, validação e codificação do CSV.
+
+Uso:
+    python -m pytest tests
+"""
+import sys
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from ingest import (DATE_FORMAT, TIME_FORMAT, SheetError, cell_text, column_index, csv_encoding,
+                    find_invalid, iter_records)
+
+HEADER = ['Cliente', 'Peça', 'Data', 'Hora', 'Código']
+
+
+def test_column_index_order():
+    assert column_index(['Código', 'Hora', 'Data', 'Peça', 'Cliente']) == {
+        'code': 0, 'time': 1, 'date': 2, 'piece': 3, 'header': 4}
+
+
+def test_column_index_accents_and_case():
+    index = column_index([' CLIENTE ', 'peca', 'DATA', 'hora', 'CODIGO', 'Obs'])
+    assert index == {'header': 0, 'piece': 1, 'date': 2, 'time': 3, 'code': 4}
+
+
+def test_column_index_first_duplicate_wins():
+    assert column_index(HEADER + ['Código'])['code'] == 4
+
+
+def test_column_index_missing():
+    with pytest.raises(SheetError) as e:
+        column_index(['Cliente', 'Peça', None])
+    assert 'Data' in str(e.value) and 'Hora' in str(e.value) and 'Código' in str(e.value)
+
+
+@pytest.mark.parametrize('field, value, text', [
+    ('date', datetime(2026, 2, 1, 13, 5), '01/02/2026'),
+    ('date', date(2026, 12, 31), '31/12/2026'),
+    ('time', datetime(2026, 2, 1, 9, 5, 3), '09:05:03'),
+    ('time', time(23, 59, 59), '23:59:59'),
+    ('time', timedelta(hours=7, minutes=30), '07:30:00'),
+    ('code', 873001.0, '873001'),
+    ('code', 873001.5, '873001.5'),
+    ('code', 873001, '873001'),
+    ('piece', '  A 960 505  ', 'A 960 505'),
+    ('piece', None, ''),
+    ('date', '18/10/2026', '18/10/2026'),
+])
+def test_cell_text(field, value, text):
+    assert cell_text(field, value) == text
+
+
+def strptime_ok(value, fmt):
+    try:
+        datetime.strptime(value, fmt)
+    except ValueError:
+        return False
+    return True
+
+
+DATES = ['18/10/2026', '1/2/2026', '01/2/2026', '29/02/2024', '29/02/2026', '31/04/2026',
+         '00/01/2026', '01/13/2026', '', '2026-10-18', '18/10/26', '18/10/2026 ']
+TIMES = ['10:00:00', '00:00:00', '23:59:59', '9:5:3', '24:00:00', '10:60:00', '10:00:60',
+         '10:00:61', '', '10:00', '10:00:00.5', ' 10:00:00']
+
+
+@pytest.mark.parametrize('value', DATES)
+def test_find_invalid_date_matches_strptime(value):
+    records = [(2, {'date': value, 'time': '10:00:00'})]
+    assert (not find_invalid(records)) == strptime_ok(value, DATE_FORMAT)
+
+
+@pytest.mark.parametrize('value', TIMES)
+def test_find_invalid_time_matches_strptime(value):
+    records = [(2, {'date': '18/10/2026', 'time': value})]
+    assert (not find_invalid(records)) == strptime_ok(value, TIME_FORMAT)
+
+
+def test_find_invalid_reports_lines_across_chunks():
+    records = [(line, {'date': '18/10/2026', 'time': '10:00:00'}) for line in range(2, 30)]
+    records[3] = (5, {'date': '32/10/2026', 'time': '10:00:00'})
+    records[20] = (22, {'date': '18/10/2026', 'time': '25:00:00'})
+    errors = find_invalid(records, chunk_size=7)
+    assert [(e.line, e.column, e.value) for e in errors] == [
+        (5, 'Data', '32/10/2026'), (22, 'Hora', '25:00:00')]
+
+
+def write_csv(path, text, encoding):
+    path.write_bytes(text.encode(encoding))
+    return str(path)
+
+
+CSV = 'Cliente;Peça;Data;Hora;Código\nDAFF;Peça Ç;18/10/2026;10:00:00;US873001\n'
+
+
+@pytest.mark.parametrize('encoding, detected', [
+    ('utf-8', 'utf-8-sig'), ('utf-8-sig', 'utf-8-sig'), ('cp1252', 'cp1252')])
+def test_csv_encoding(tmp_path, encoding, detected):
+    path = write_csv(tmp_path / 'a.csv', CSV, encoding)
+    assert csv_encoding(path) == detected
+    assert list(iter_records(path)) == [(2, {'header': 'DAFF', 'piece': 'Peça Ç',
+                                             'date': '18/10/2026', 'time': '10:00:00',
+                                             'code': 'US873001'})]
+
+
+def test_csv_encoding_late_invalid_byte(tmp_path):
+    # UTF-8 válido no começo, cp1252 só depois do primeiro bloco
+    path = tmp_path / 'a.csv'
+    path.write_bytes(CSV.encode('utf-8') + b'DAFF;x;18/10/2026;10:00:00;US1\n' * 100
+                     + 'DAFF;Peça;18/10/2026;10:00:00;US2\n'.encode('cp1252'))
+    assert csv_encoding(str(path), chunk=64) == 'cp1252'
+
+
+def test_csv_undecodable(tmp_path):
+    path = tmp_path / 'a.csv'
+    path.write_bytes(b'Cliente;Peca;Data;Hora;Codigo\nDAFF;\x81\x8d;18/10/2026;10:00:00;US1\n')
+    with pytest.raises(SheetError) as e:
+        list(iter_records(str(path)))
+    assert 'a.csv' in str(e.value)
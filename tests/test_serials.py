@@ -0,0 +1,136 @@
+"""Códigos sequenciais: padrões, reserva persistente e numeração dos grupos.
+
+Uso:
+    python -m pytest tests
+"""
+import json
+import multiprocessing
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from Gerador import sequence_labels
+from serials import CounterStore, PatternError, check_pattern, codes
+
+
+def label(code, header='DAFF'):
+    return {'header': header, 'piece': 'A 960', 'date': '18/10/2026', 'time': '10:00:00',
+            'code': code, 'logo': None}
+
+
+@pytest.mark.parametrize('pattern', ['US873{seq}', 'US873{seq:03d}', '{seq:06d}-A', 'X{seq:x}'])
+def test_check_pattern_accepts(pattern):
+    check_pattern(pattern)
+
+
+@pytest.mark.parametrize('pattern', [
+    'US873001',             # sem campo
+    'US{seq}{seq}',         # campo repetido
+    'US{seq}{lote}',        # outro campo
+    'US{}',                 # campo sem nome
+    'US{seq:03q}',          # formato inválido
+    'US{seq',               # chave aberta
+])
+def test_check_pattern_rejects(pattern):
+    with pytest.raises(PatternError):
+        check_pattern(pattern)
+
+
+def test_codes():
+    assert codes('US873{seq:03d}', 9, 3) == ['US873009', 'US873010', 'US873011']
+
+
+def test_reserve_persists(tmp_path):
+    path = tmp_path / 'contadores.json'
+    store = CounterStore(str(path))
+    assert store.reserve('US{seq:03d}', 17) == 1
+    assert store.reserve('US{seq:03d}', 5) == 18
+    # Outra instância (reinício do programa) continua de onde parou
+    again = CounterStore(str(path))
+    assert again.next('US{seq:03d}') == 23
+    assert again.reserve('US{seq:03d}', 1) == 23
+    assert json.loads(path.read_text(encoding='utf-8')) == {'US{seq:03d}': 24}
+
+
+def test_reserve_start(tmp_path):
+    store = CounterStore(str(tmp_path / 'contadores.json'))
+    assert store.reserve('US{seq}', 10, start=100) == 100
+    # Início abaixo do contador não volta atrás
+    assert store.reserve('US{seq}', 10, start=1) == 110
+    # Início acima pula os números intermediários
+    assert store.reserve('US{seq}', 10, start=500) == 500
+    assert store.next('US{seq}', start=1) == 510
+
+
+def test_reserve_patterns_independent(tmp_path):
+    store = CounterStore(str(tmp_path / 'contadores.json'))
+    assert store.reserve('A{seq}', 3) == 1
+    assert store.reserve('B{seq}', 2) == 1
+    assert store.reserve('A{seq}', 1) == 4
+    assert store.next('B{seq}') == 3
+
+
+def test_reserve_invalid_pattern_keeps_file(tmp_path):
+    path = tmp_path / 'contadores.json'
+    store = CounterStore(str(path))
+    with pytest.raises(PatternError):
+        store.reserve('US{seq}{seq}', 3)
+    assert not path.exists()
+
+
+def test_unreadable_counters_refused(tmp_path):
+    path = tmp_path / 'contadores.json'
+    path.write_text('{corrompido', encoding='utf-8')
+    with pytest.raises(PatternError):
+        CounterStore(str(path)).reserve('US{seq}', 1)
+    assert path.read_text(encoding='utf-8') == '{corrompido'
+
+
+def _reserve_many(path, n, out):
+    store = CounterStore(path)
+    out.put([store.reserve('US{seq}', 3) for _ in range(n)])
+
+
+def test_reserve_across_processes(tmp_path):
+    path = str(tmp_path / 'contadores.json')
+    out = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_reserve_many, args=(path, 25, out))
+             for _ in range(4)]
+    for p in procs:
+        p.start()
+    firsts = [first for _ in procs for first in out.get(timeout=60)]
+    for p in procs:
+        p.join()
+    # 100 faixas de 3, sem sobreposição nem buracos
+    assert sorted(firsts) == list(range(1, 301, 3))
+    assert CounterStore(path).next('US{seq}') == 301
+
+
+def test_sequence_labels(tmp_path):
+    store = CounterStore(str(tmp_path / 'contadores.json'))
+    groups = [(label('US{seq:03d}'), 3), (label('FIXO', 'IVECO'), 2), (label('US{seq:03d}'), 0)]
+    labels, ranges = sequence_labels(groups, store, start=8)
+    assert [lb['code'] for lb in labels] == ['US008', 'US009', 'US010', 'FIXO', 'FIXO']
+    assert [lb['header'] for lb in labels] == ['DAFF']*3 + ['IVECO']*2
+    assert ranges == [('US008', 'US010')]
+    # Grupo com quantidade 0 não reserva nada
+    assert store.next('US{seq:03d}') == 11
+
+
+def test_sequence_labels_continue(tmp_path):
+    store = CounterStore(str(tmp_path / 'contadores.json'))
+    sequence_labels([(label('US{seq:03d}'), 17)], store)
+    labels, ranges = sequence_labels([(label('US{seq:03d}'), 2), (label('L{seq}'), 2)], store)
+    assert [lb['code'] for lb in labels] == ['US018', 'US019', 'L1', 'L2']
+    assert ranges == [('US018', 'US019'), ('L1', 'L2')]
+
+
+def test_sequence_labels_without_patterns():
+    # Sem padrão, os contadores nem são consultados
+    labels, ranges = sequence_labels([(label('US873001'), 2)], None)
+    assert [lb['code'] for lb in labels] == ['US873001']*2
+    assert ranges == []
@@ -0,0 +1,192 @@
+"""Modo serviço: validação dos trabalhos, requisições HTTP e cliente da interface.
+
+Uso:
+    python -m pytest tests
+"""
+import asyncio
+import json
+import queue
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import Gerador
+import serials
+import service
+from layout import A4_SHEET
+
+
+def label(code='US873001', **kw):
+    return dict({'header': 'DAFF', 'piece': 'A 960', 'date': '18/10/2026', 'time': '10:00:00',
+                 'code': code, 'logo': None}, **kw)
+
+
+def generate(monkeypatch, tmp_path, groups, failure):
+    """Roda a geração da interface com o serviço respondendo `failure`; devolve as mensagens."""
+    def request_pdf(*args, **kw):
+        raise failure
+    monkeypatch.setattr(service, 'request_pdf', request_pdf)
+    calls = []
+
+    def sequence_labels(groups, counters, start=1):
+        calls.append(groups)
+        return Gerador.expand_groups(groups), []
+    monkeypatch.setattr(Gerador, 'sequence_labels', sequence_labels)
+    monkeypatch.setattr(Gerador, 'open_file', lambda path: None)
+    q = queue.Queue()
+    Gerador.EtiquetaApp._generate_worker(groups, 1, str(tmp_path / 'etiquetas.pdf'),
+                                         Gerador.BRAND_TEXT, Gerador.SUBBRAND_TEXT,
+                                         threading.Event(), q, None, A4_SHEET,
+                                         '127.0.0.1:1', None)
+    return [msg[0] for msg in q.queue if msg[0] != 'page'], calls
+
+
+@pytest.mark.parametrize('failure', [service.ServiceError('fila cheia', 503),
+                                     service.ServiceError('grande demais', 413),
+                                     ConnectionRefusedError('recusada')])
+def test_sequence_job_never_falls_back(monkeypatch, tmp_path, failure):
+    # Os contadores locais não conhecem os números emitidos pelo serviço
+    msgs, calls = generate(monkeypatch, tmp_path, [(label('US{seq:03d}'), 3)], failure)
+    assert msgs == ['error']
+    assert calls == []
+
+
+@pytest.mark.parametrize('failure', [service.ServiceError('fila cheia', 503),
+                                     ConnectionRefusedError('recusada')])
+def test_plain_job_falls_back(monkeypatch, tmp_path, failure):
+    msgs, calls = generate(monkeypatch, tmp_path, [(label(), 3)], failure)
+    assert msgs == ['ranges', 'done']
+    assert len(calls) == 1
+    assert (tmp_path / 'etiquetas.pdf').exists()
+
+
+def test_plain_job_bad_request_not_retried(monkeypatch, tmp_path):
+    msgs, calls = generate(monkeypatch, tmp_path, [(label(), 3)],
+                           service.ServiceError('inválido', 400))
+    assert msgs == ['error']
+    assert calls == []
+
+
+TEMPLATES = {A4_SHEET.name: A4_SHEET}
+
+
+def job(**group):
+    return {'groups': [dict({'header': 'DAFF', 'piece': 'A 960', 'date': '18/10/2026',
+                             'time': '10:00:00', 'code': 'US873001', 'count': 17}, **group)]}
+
+
+def test_parse_job_ok(tmp_path):
+    data = dict(job(code='US{seq:03d}'), start='5', brand='B', subbrand='S')
+    counters = serials.CounterStore(str(tmp_path / 'contadores.json'))
+    groups, start, template, brand, subbrand = service.parse_job(
+        data, {'DAFF': 'logos/daf.png'}, TEMPLATES, counters=counters)
+    assert [(g['code'], g['logo'], n) for g, n in groups] == [('US{seq:03d}', 'logos/daf.png', 17)]
+    assert (start, template, brand, subbrand) == (5, A4_SHEET, 'B', 'S')
+    # Validar não reserva números
+    assert counters.next('US{seq:03d}') == 1
+
+
+@pytest.mark.parametrize('data, message', [
+    (None, 'sem grupos'),
+    ({}, 'sem grupos'),
+    ({'groups': []}, 'sem grupos'),
+    ({'groups': [{'header': 'DAFF'}]}, 'Grupo 1: informe'),
+    (job(count='x'), 'Grupo 1: informe'),
+    (job(date='31/02/2026'), 'Data/Hora'),
+    (job(time='24:00:00'), 'Data/Hora'),
+    (job(count=-1), 'quantidade'),
+    (job(count=0), 'total de etiquetas'),
+    (job(count=10**6), 'total de etiquetas'),
+    (dict(job(), template='A5-99'), 'Modelo de folha desconhecido'),
+    (job(code='US{seq}{seq}'), 'Padrão de código inválido'),
+    (dict(job(code='US{seq}'), start='um'), 'Início da sequência'),
+])
+def test_parse_job_rejects(tmp_path, data, message):
+    counters = serials.CounterStore(str(tmp_path / 'contadores.json'))
+    with pytest.raises(service.JobError) as e:
+        service.parse_job(data, {}, TEMPLATES, counters=counters)
+    assert message in str(e.value)
+
+
+def test_parse_job_rejects_second_group():
+    data = job()
+    data['groups'].append(dict(data['groups'][0], date='1/13/2026'))
+    with pytest.raises(service.JobError, match='Grupo 2: Data/Hora'):
+        service.parse_job(data, {}, TEMPLATES)
+
+
+def test_parse_job_sequence_needs_counters():
+    with pytest.raises(service.JobError, match='não habilitados'):
+        service.parse_job(job(code='US{seq}'), {}, TEMPLATES, counters=None)
+
+
+class FakeWriter:
+    """Só o que LabelService.handle usa de asyncio.StreamWriter."""
+
+    def __init__(self):
+        self.data = b''
+        self.closed = False
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def svc():
+    s = service.LabelService({}, TEMPLATES, workers=1)
+    yield s
+    s.close()
+
+
+def handle(svc, request):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(request)
+        reader.feed_eof()
+        writer = FakeWriter()
+        await svc.handle(reader, writer)
+        return writer
+    writer = asyncio.run(run())
+    assert writer.closed
+    status = writer.data.split(b'\r\n', 1)[0]
+    return int(status.split()[1]) if status else None
+
+
+@pytest.mark.parametrize('request_bytes', [
+    b'\r\n',
+    b'GET\r\n\r\n',
+    b'POST /labels HTTP/1.1\r\nContent-Length: -5\r\n\r\n',
+    b'POST /labels HTTP/1.1\r\nContent-Length: dez\r\n\r\n',
+    b'POST /labels HTTP/1.1\r\nContent-Length: 2\r\n\r\n{]',
+])
+def test_handle_bad_request(svc, request_bytes):
+    assert handle(svc, request_bytes) == 400
+
+
+def test_handle_too_large(svc):
+    req = f'POST /labels HTTP/1.1\r\nContent-Length: {service.MAX_BODY + 1}\r\n\r\n'
+    assert handle(svc, req.encode('latin-1')) == 413
+
+
+def test_handle_health_and_routes(svc):
+    assert handle(svc, b'GET /health HTTP/1.1\r\n\r\n') == 200
+    assert handle(svc, b'GET /nada HTTP/1.1\r\n\r\n') == 404
+    assert handle(svc, b'GET /labels HTTP/1.1\r\n\r\n') == 405
+
+
+def test_handle_invalid_job(svc):
+    body = json.dumps(job(date='1/13/2026')).encode('utf-8')
+    req = b'POST /labels HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % len(body) + body
+    assert handle(svc, req) == 400
+    assert svc.stats['errors'] == 1
@@ -0,0 +1,82 @@
+"""Medição opcional do tempo gasto em cada etapa da geração das etiquetas.
+
+Ligada pela variável de ambiente ETIQUETAS_TIMING (caminho do JSON de
+saída) ou pela opção --timing do Gerador.py. Desligada, `stage` devolve
+sempre o mesmo contexto vazio e o custo por chamada é desprezível.
+
+As etapas podem ser aninhadas (p.ex. 'pdf.sheet' inclui 'pdf.barcode'):
+cada total é o tempo inclusivo da etapa, somado em todas as chamadas.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+ENV_VAR = 'ETIQUETAS_TIMING'
+
+_NULL = nullcontext()
+
+
+class Timings:
+    """Totais (segundos, chamadas) por etapa, seguros entre threads."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.path is not None
+
+    def enable(self, path):
+        self.path = path
+
+    def stage(self, name):
+        """Contexto que soma o tempo do bloco à etapa `name` (quando ligado)."""
+        if self.path is None:
+            return _NULL
+        return self._measure(name)
+
+    @contextmanager
+    def _measure(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def add(self, name, seconds, calls=1):
+        with self._lock:
+            total, n = self._totals.get(name, (0.0, 0))
+            self._totals[name] = (total + seconds, n + calls)
+
+    def merge(self, totals):
+        """Soma os totais de outro processo (formato de `totals()`)."""
+        for name, t in totals.items():
+            self.add(name, t['seconds'], t['calls'])
+
+    def totals(self):
+        with self._lock:
+            return {name: {'seconds': round(total, 6), 'calls': n}
+                    for name, (total, n) in sorted(self._totals.items())}
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+
+    def dump(self, path=None):
+        """Grava os totais em JSON; erros de disco são só registrados."""
+        path = path or self.path
+        if not path:
+            return
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.totals(), f, indent=2, ensure_ascii=False)
+        except OSError as e:
+            print('Erro ao gravar tempos:', e)
+
+
+TIMINGS = Timings(os.environ.get(ENV_VAR) or None)
+stage = TIMINGS.stage
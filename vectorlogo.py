@@ -0,0 +1,139 @@
+"""Logos vetoriais (SVG ou PDF) desenhadas como caminhos no PDF das etiquetas.
+
+O arquivo é lido com PyMuPDF (pacote opcional `pymupdf`): os caminhos da
+primeira página são convertidos em comandos do ReportLab, então a logo vai
+para o PDF como vetor, dentro do mesmo form reutilizado por todas as
+etiquetas, em vez de um bitmap de 300 dpi. Preview, ZPL e pacote de logos
+continuam usando a versão rasterizada (`rasterize`).
+"""
+import os
+from dataclasses import dataclass
+
+VECTOR_EXTS = ('.svg', '.pdf')
+# Lado maior (px) da rasterização usada no preview e no ZPL
+RASTER_PX = 1024
+
+
+def is_vector(path):
+    return os.path.splitext(path)[1].lower() in VECTOR_EXTS
+
+
+def _open(path):
+    try:
+        import pymupdf
+    except ImportError:
+        raise RuntimeError('Logos SVG/PDF requerem o pacote pymupdf (pip install pymupdf)')
+    return pymupdf.open(path)
+
+
+@dataclass(frozen=True)
+class VectorLogo:
+    """Caminhos da logo, em coordenadas da página de origem (y para baixo)."""
+    width: float
+    height: float
+    paths: tuple
+
+
+def load_vector(path):
+    with _open(path) as doc:
+        page = doc[0]
+        return VectorLogo(page.rect.width, page.rect.height, tuple(page.get_drawings()))
+
+
+def rasterize(path):
+    """Logo vetorial como imagem RGB sobre branco, com o lado maior em RASTER_PX."""
+    import pymupdf
+    from PIL import Image
+    with _open(path) as doc:
+        page = doc[0]
+        zoom = RASTER_PX / max(page.rect.width, page.rect.height)
+        pix = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+        return Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+
+
+def _path(c, items, close):
+    p = c.beginPath()
+    cur = None
+    for item in items:
+        op = item[0]
+        if op == 're':
+            r = item[1]
+            p.rect(r.x0, r.y0, r.width, r.height)
+            cur = None
+            continue
+        if op == 'qu':
+            q = item[1]
+            p.moveTo(q.ul.x, q.ul.y)
+            for pt in (q.ur, q.lr, q.ll):
+                p.lineTo(pt.x, pt.y)
+            p.close()
+            cur = None
+            continue
+        start = item[1]
+        if cur is None or abs(cur.x - start.x) > 1e-3 or abs(cur.y - start.y) > 1e-3:
+            p.moveTo(start.x, start.y)
+        if op == 'l':
+            cur = item[2]
+            p.lineTo(cur.x, cur.y)
+        elif op == 'c':
+            c1, c2, cur = item[2], item[3], item[4]
+            p.curveTo(c1.x, c1.y, c2.x, c2.y, cur.x, cur.y)
+    if close:
+        p.close()
+    return p
+
+
+def draw_vector(c, logo, width, height):
+    """Desenha a logo ocupando a caixa (0, 0, width, height) do canvas.
+
+    Como no caminho raster (drawImage com largura e altura da caixa), a
+    logo é esticada para preencher a caixa inteira.
+    """
+    from reportlab.pdfgen.canvas import FILL_EVEN_ODD, FILL_NON_ZERO
+    c.saveState()
+    # Página de origem tem y para baixo
+    c.translate(0, height)
+    c.scale(width/logo.width, -height/logo.height)
+    for d in logo.paths:
+        fill = 'f' in d['type'] and d.get('fill') is not None
+        stroke = 's' in d['type'] and d.get('color') is not None
+        if not (fill or stroke):
+            continue
+        c.saveState()
+        if fill:
+            c.setFillColorRGB(*d['fill'])
+            if (d.get('fill_opacity') or 1) < 1:
+                c.setFillAlpha(d['fill_opacity'])
+        if stroke:
+            c.setStrokeColorRGB(*d['color'])
+            if (d.get('stroke_opacity') or 1) < 1:
+                c.setStrokeAlpha(d['stroke_opacity'])
+            c.setLineWidth(d.get('width') or 1)
+            if d.get('lineCap'):
+                c.setLineCap(max(d['lineCap']))
+            if d.get('lineJoin') is not None:
+                c.setLineJoin(int(d['lineJoin']))
+            if d.get('dashes') and d['dashes'] != '[] 0':
+                dashes, _, phase = d['dashes'].rpartition(' ')
+                c.setDash([float(v) for v in dashes.strip('[] ').split()], float(phase))
+        c.drawPath(_path(c, d['items'], d.get('closePath')), stroke=int(stroke), fill=int(fill),
+                   fillMode=FILL_EVEN_ODD if d.get('even_odd') else FILL_NON_ZERO)
+        c.restoreState()
+    c.restoreState()
+
+
+def end_form(c):
+    """endForm que declara nos recursos do form os estados de opacidade usados.
+
+    setFillAlpha/setStrokeAlpha viram `/gRLsN gs`, mas o ReportLab só põe o
+    ExtGState correspondente nos recursos das páginas; sem isto o nome fica
+    indefinido dentro do form e os leitores descartam os trechos translúcidos.
+    """
+    from reportlab.pdfbase.pdfdoc import PDFResourceDictionary
+    state = c._extgstate.getState()
+    if state is None:
+        c.endForm()
+        return
+    resources = PDFResourceDictionary(ExtGState=state)
+    resources.basicFonts()
+    c.endForm(Resources=resources)
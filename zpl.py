@@ -0,0 +1,177 @@
+"""Saída direta em ZPL para impressoras térmicas de etiquetas 74x34 mm.
+
+Usa os mesmos campos e a mesma geometria do PDF (layout.py), mas gera uma
+etiqueta ^XA...^XZ por vez, com fontes e Code128 nativos da impressora
+(^A0/^BC). Cada logo é enviada uma única vez por trabalho como gráfico
+(~DG) e referenciada por nome (^XG) nas etiquetas seguintes, então a
+impressora não precisa rasterizar uma página A4 inteira.
+"""
+import math
+import os
+import socket
+
+from reportlab.lib.units import mm
+
+from layout import (LABEL_W, LABEL_H, BARCODE_BAR_WIDTH, BARCODE_HEIGHT,
+                    BARCODE_MAX_WIDTH, brand_block, place_label)
+
+# 8 pontos/mm = 203 dpi, a resolução mais comum das térmicas da linha
+DEFAULT_DPMM = 8
+# Porta "raw" padrão das impressoras de rede
+DEFAULT_PORT = 9100
+# Zona de silêncio do Code128, em módulos
+QUIET_MODULES = 10
+
+
+def _field(text):
+    """Campo de texto com ^FH, escapando os caracteres de comando do ZPL."""
+    text = str(text).replace('_', '_5F').replace('^', '_5E').replace('~', '_7E')
+    return f'^FH^FD{text}^FS'
+
+
+def code128_modules(value):
+    """Largura do Code128 em módulos, sem zonas de silêncio."""
+    from reportlab.graphics.barcode import code128
+    return int(round(code128.Code128(value, barWidth=1, quiet=0).width))
+
+
+def logo_graphic(img, width, height):
+    """Converte a logo (RGB) em gráfico 1 bit do ZPL que cabe em width x height pontos.
+
+    Retorna (bytes por linha, total de bytes, dados em hexa).
+    """
+    from PIL import Image
+    scale = min(width/img.width, height/img.height)
+    size = (max(1, int(img.width*scale)), max(1, int(img.height*scale)))
+    # Bit 1 = ponto queimado (preto) no ZPL
+    mono = (img.resize(size, Image.LANCZOS).convert('L')
+            .point(lambda v: 255 if v < 128 else 0)
+            .convert('1', dither=Image.Dither.NONE))
+    row_bytes = math.ceil(size[0] / 8)
+    data = mono.tobytes()
+    return row_bytes, len(data), data.hex().upper()
+
+
+class ZplRenderer:
+    """Gera o ZPL das etiquetas de um trabalho, baixando cada logo uma vez.
+
+    `load_logo(path)` devolve a logo já achatada em RGB (p.ex.
+    Gerador.LOGO_CACHE.flattened).
+    """
+
+    def __init__(self, load_logo, brand_text, subbrand_text, dpmm=DEFAULT_DPMM):
+        self.load_logo = load_logo
+        self.brand = brand_block(brand_text, subbrand_text)
+        self.dpmm = dpmm
+        self._graphics = {}
+
+    def dots(self, pt):
+        return int(round(pt / mm * self.dpmm))
+
+    def _at(self, x, y):
+        # Coordenadas da etiqueta (pontos, y para cima) -> pontos da impressora
+        return self.dots(x), self.dots(LABEL_H - y)
+
+    def _text(self, x, y, text, size):
+        """Texto com a linha de base em (x, y), como drawString."""
+        fx, fy = self._at(x, y)
+        h = self.dots(size)
+        return f'^FT{fx},{fy}^A0N,{h},{h}{_field(text)}'
+
+    def _centred(self, cx, y, text, size):
+        """Texto centralizado em cx com a linha de base em y, como drawCentredString."""
+        half = min(cx, LABEL_W - cx)
+        h = self.dots(size)
+        fx, fy = self._at(cx - half, y)
+        return f'^FO{fx},{fy - h}^FB{self.dots(2*half)},1,0,C^A0N,{h},{h}{_field(text)}'
+
+    def _logo(self, path, box):
+        """Comandos para desenhar a logo; a primeira vez inclui o download do gráfico."""
+        x, y, w, h = box
+        key = (path, w, h)
+        download = ''
+        name = self._graphics.get(key)
+        if name is None:
+            name = f'LOGO{len(self._graphics)}.GRF'
+            row_bytes, total, data = logo_graphic(self.load_logo(path), self.dots(w), self.dots(h))
+            download = f'~DGR:{name},{total},{row_bytes},{data}\n'
+            self._graphics[key] = name
+        fx, fy = self._at(x, y + h)
+        # A caixa da logo grande passa um pouco da borda superior; a
+        # impressora não aceita origem negativa
+        return download, f'^FO{fx},{max(0, fy)}^XGR:{name},1,1^FS'
+
+    def _barcode(self, value):
+        bars = code128_modules(value)
+        # Módulo inteiro em pontos da impressora, o maior que cabe na largura máxima
+        module = max(1, min(self.dots(BARCODE_BAR_WIDTH),
+                            self.dots(BARCODE_MAX_WIDTH) // (bars + 2*QUIET_MODULES)))
+        width = bars * module
+        h = self.dots(BARCODE_HEIGHT)
+        # Alinhado à direita como no PDF, deixando a zona de silêncio
+        x = self.dots(LABEL_W - 5*mm) - (bars + QUIET_MODULES)*module
+        _, y = self._at(0, 6*mm + BARCODE_HEIGHT)
+        cx = (x + width/2) / self.dpmm * mm
+        return '\n'.join([
+            f'^FO{x},{y}^BY{module}^BCN,{h},N,N,N,A{_field(value)}',
+            self._centred(cx, 6*mm + BARCODE_HEIGHT + 2*mm, value, 7.5),
+        ])
+
+    def label(self, label):
+        """ZPL de uma etiqueta (dict de campos, com 'logo' opcional)."""
+        placed = place_label(label)
+        brand = self.brand
+        download = ''
+        cmds = ['^XA', '^CI28', f'^PW{self.dots(LABEL_W)}', f'^LL{self.dots(LABEL_H)}', '^LH0,0']
+        logo = label.get('logo')
+        if logo and os.path.exists(logo):
+            download, cmd = self._logo(logo, placed.logo_box)
+            cmds.append(cmd)
+        if placed.header_pos:
+            cmds.append(self._text(*placed.header_pos, label['header'], 12))
+        cmds += [
+            self._text(placed.piece_x, LABEL_H-12*mm, label['piece'], 8),
+            self._text(placed.piece_x, LABEL_H-16*mm, 'SHROUD', 8),
+            self._centred(brand.center_x, brand.brand_y, brand.brand_text, 9),
+            self._centred(brand.center_x, brand.subbrand_y, brand.subbrand_text, 7),
+            self._text(2*mm, LABEL_H-23*mm, f"DATA: {label['date']}", 7.5),
+            self._text(2*mm, LABEL_H-28*mm, f"HORA: {label['time']}", 7.5),
+            self._barcode(str(label['code'])),
+            '^XZ',
+        ]
+        return download + '\n'.join(cmds) + '\n'
+
+
+class TcpSink:
+    """Envia o ZPL para a porta raw de uma impressora de rede."""
+
+    def __init__(self, host, port=DEFAULT_PORT, timeout=10):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+
+    def write(self, data):
+        self.sock.sendall(data)
+
+    def close(self):
+        self.sock.close()
+
+
+def open_sink(target):
+    """Arquivo local ou impressora em 'tcp://host[:porta]'."""
+    if target.startswith('tcp://'):
+        host, _, port = target[len('tcp://'):].partition(':')
+        return TcpSink(host, int(port or DEFAULT_PORT))
+    return open(target, 'wb')
+
+
+def write_zpl(labels, target, load_logo, brand_text, subbrand_text, dpmm=DEFAULT_DPMM):
+    """Escreve o ZPL das etiquetas em `target` (ver open_sink). Retorna o total."""
+    renderer = ZplRenderer(load_logo, brand_text, subbrand_text, dpmm)
+    sink = open_sink(target)
+    total = 0
+    try:
+        for label in labels:
+            sink.write(renderer.label(label).encode('utf-8'))
+            total += 1
+    finally:
+        sink.close()
+    return total